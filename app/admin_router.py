@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
+from fastapi import APIRouter, Depends, BackgroundTasks, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
@@ -6,18 +6,42 @@ from app.exports.service import ExportService
 from app.connectors.service import ExternalConnector
 from app.insights.service import InsightService
 
+from app.llm.client import ClientDisconnected, cancel_on_disconnect
+from app.llm.coalesce import llm_flights
 from app.reviews.service import SentimentService
+from app.utils.cache import cache_instance
+from app.utils.semantic_cache import semantic_cache
 
 router = APIRouter(prefix="/admin", tags=["Admin Operations"])
 
 @router.get("/sentiment/{product_id}")
-def analyze_product_sentiment(product_id: int, db: Session = Depends(get_db)):
-    result = SentimentService.analyze_reviews(db, product_id)
+async def analyze_product_sentiment(product_id: int, request: Request):
+    try:
+        result = await cancel_on_disconnect(request, SentimentService.analyze_reviews(product_id))
+    except ClientDisconnected:
+        return Response(status_code=499)
     return {"analysis": result}
 
+@router.get("/cache/stats")
+def cache_stats():
+    """Entries, approximate memory, hit rate and evictions of the shared in-process cache."""
+    return cache_instance.stats()
+
+@router.get("/cache/semantic-stats")
+def semantic_cache_stats():
+    """Hit/miss counts and best-similarity histograms for tuning SEMANTIC_CACHE_THRESHOLD."""
+    return semantic_cache.stats()
+
+@router.get("/llm/coalescing-stats")
+def llm_coalescing_stats():
+    """Upstream model calls made vs. calls saved by sharing identical in-flight questions."""
+    return llm_flights.stats()
+
 @router.get("/export/excel")
-def export_insights_excel(db: Session = Depends(get_db)):
-    insights = InsightService.get_all_insights(db)
+def export_insights_excel(
+    source_website: str | None = Query(None), db: Session = Depends(get_db)
+):
+    insights = InsightService.get_all_insights(db, source_website)
     # Flatten insights for excel
     data = [{"Title": i.title, "Message": i.message, "Category": i.category} for i in insights]
     file = ExportService.generate_excel_report(data)
@@ -28,8 +52,10 @@ def export_insights_excel(db: Session = Depends(get_db)):
     )
 
 @router.get("/export/pdf")
-def export_insights_pdf(db: Session = Depends(get_db)):
-    insights = InsightService.get_all_insights(db)
+def export_insights_pdf(
+    source_website: str | None = Query(None), db: Session = Depends(get_db)
+):
+    insights = InsightService.get_all_insights(db, source_website)
     data = [{"title": i.title, "message": i.message} for i in insights]
     file = ExportService.generate_pdf_report(data)
     return StreamingResponse(
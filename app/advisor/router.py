@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.database import get_db
 from app.advisor.schemas import AdvisorRequest, AdvisorResponse
 from app.advisor.service import AdvisorService
+from app.llm.client import ClientDisconnected, cancel_on_disconnect
+from app.llm.streaming import sse_response
 
 router = APIRouter(
     prefix="/advisor",
@@ -11,13 +13,31 @@ router = APIRouter(
 )
 
 @router.post("/ask", response_model=AdvisorResponse)
-def ask_merchant_advisor(request: AdvisorRequest, db: Session = Depends(get_db)):
+async def ask_merchant_advisor(
+    request: AdvisorRequest, http_request: Request, db: Session = Depends(get_db)
+):
     """
     Ask high-level business questions to the AI Merchant Advisor.
     Example: "Which district has the highest sales?" or "Should I invest more in Panjabi?"
     """
-    answer = AdvisorService.ask_advisor(db, request.query)
+    try:
+        answer = await cancel_on_disconnect(
+            http_request, AdvisorService.ask_advisor(db, request.query, request.source_website)
+        )
+    except ClientDisconnected:
+        return Response(status_code=499) # Client closed request; the model call was cancelled
     return {
         "answer": answer,
         "generated_at": datetime.now()
     }
+
+@router.post("/ask/stream")
+async def stream_merchant_advisor(request: AdvisorRequest, db: Session = Depends(get_db)):
+    """
+    Same as /ask, but the answer is sent as server-sent events while it is generated:
+    `data: {"delta": "..."}` per chunk, then `event: done`.
+    """
+    return sse_response(
+        AdvisorService.stream_advisor(db, request.query, request.source_website),
+        done={"generated_at": datetime.now().isoformat()},
+    )
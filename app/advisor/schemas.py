@@ -4,6 +4,7 @@ from datetime import datetime
 
 class AdvisorRequest(BaseModel):
     query: str
+    source_website: Optional[str] = None # Scope the advice to one tenant's data
 
 class AdvisorResponse(BaseModel):
     answer: str
@@ -1,89 +1,186 @@
-import google.generativeai as genai
-import os
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import func, desc
-from app.orders.models import Order, OrderDetail
+from app.analytics.models import DailySalesRollup
+from app.orders.models import Order
 from app.products.models import Product
-from app.users.models import User, UserAddress
 from datetime import datetime, timedelta
+import hashlib
 
-from app.utils.cache import cache_instance
-
-# Configure Gemini
-try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel('gemini-1.5-flash')
-except Exception:
-    model = None
+from app.llm.client import LLMBusy, LLMError, LLMTimeout, llm_client
+from app.llm.coalesce import llm_flights
+from app.utils import cache_tags
+from app.utils.cache import MISSING, cache_instance, cached, tenant_key
+from app.utils.semantic_cache import normalize_text, semantic_cache
 
 class AdvisorService:
+    UNAVAILABLE_MESSAGE = "দুঃখিত, এআই অ্যাডভাইজার এই মুহূর্তে সক্রিয় নেই। অনুগ্রহ করে আপনার API Key চেক করুন।"
+    BUSY_MESSAGE = "দুঃখিত, এআই অ্যাডভাইজার এখন ব্যস্ত। কিছুক্ষণ পর আবার চেষ্টা করুন।"
+
+    CONTEXT_TTL_SECONDS = 6 * 3600 # writes invalidate it; the TTL only bounds idle memory
+    ANSWER_TTL_SECONDS = 86400 # answers die with their context version, not with time
+
     @staticmethod
-    def get_business_context(db: Session, force_refresh: bool = False):
-        # Cache context for 15 minutes
-        cache_key = "business_context_summary"
-        if not force_refresh:
-            cached_context = cache_instance.get(cache_key)
-            if cached_context:
-                return cached_context
+    def get_business_context(
+        db: Session, force_refresh: bool = False, source_website: str | None = None
+    ):
+        """Return ``(context, version)``; the version is a hash of the context text.
 
+        Cached answers are keyed by the version, so they stay valid exactly as
+        long as the numbers they were based on.
+        """
+        # Cached per tenant until an order or product write moves these counters
+        table_versions = cache_tags.versions(db, cache_tags.read_tags(("orders", "products"), source_website))
+        if force_refresh:
+            AdvisorService._business_context.invalidate(db, source_website, table_versions)
+        return AdvisorService._business_context(db, source_website, table_versions)
+
+    @staticmethod
+    @cached("advisor_context", ttl_seconds=CONTEXT_TTL_SECONDS)
+    def _business_context(db: Session, source_website: str | None, table_versions: dict):
         # Fetch key metrics for context
-        total_orders = db.query(Order).count()
-        total_revenue = db.query(func.sum(Order.total_amount)).scalar() or 0
+        orders = db.query(func.count(Order.id), func.sum(Order.total_amount))
+        rollup = db.query(DailySalesRollup)
+        if source_website:
+            orders = orders.filter(Order.source_website == source_website)
+            rollup = rollup.filter(DailySalesRollup.source_website == source_website)
+        total_orders, total_revenue = orders.one()
+        total_revenue = total_revenue or 0
         
         # Region stats
-        region_stats = db.query(
-            UserAddress.district, 
-            func.count(Order.id).label('order_count'),
-            func.sum(Order.total_amount).label('revenue')
-        ).join(User, UserAddress.user_id == User.id)\
-         .join(Order, User.id == Order.user_id)\
-         .group_by(UserAddress.district)\
+        region_stats = rollup.with_entities(
+            DailySalesRollup.district, 
+            func.sum(DailySalesRollup.quantity).label('qty_sold'),
+            func.sum(DailySalesRollup.revenue).label('revenue')
+        ).group_by(DailySalesRollup.district)\
          .order_by(desc('revenue'))\
          .limit(3).all() # Reduced from 5 to 3 to save tokens
         
         # Product stats
-        top_products = db.query(
+        top_products = rollup.with_entities(
             Product.product_name,
-            func.sum(OrderDetail.quantity).label('qty_sold')
-        ).join(OrderDetail, Product.id == OrderDetail.product_id)\
-         .group_by(Product.id)\
+            func.sum(DailySalesRollup.quantity).label('qty_sold')
+        ).join(Product, Product.id == DailySalesRollup.product_id)\
+         .group_by(Product.id, Product.product_name)\
          .order_by(desc('qty_sold'))\
          .limit(3).all() # Reduced from 5 to 3 to save tokens
 
         context = f"Orders:{total_orders}, Rev:{total_revenue}. "
-        context += "Top Regions: " + ", ".join([f"{r[0]}({r[1]} orders)" for r in region_stats]) + ". "
+        context += "Top Regions: " + ", ".join([f"{r[0]}({r[1]} sold)" for r in region_stats]) + ". "
         context += "Top Prods: " + ", ".join([f"{p[0]}({p[1]} sold)" for p in top_products])
         
-        cache_instance.set(cache_key, context, ttl_seconds=900) # 15 mins cache
-        return context
+        version = hashlib.sha1(context.encode()).hexdigest()[:12]
+        AdvisorService._supersede(source_website, version)
+        return context, version
 
     @staticmethod
-    def ask_advisor(db: Session, query: str):
-        if not model:
-            return "দুঃখিত, এআই অ্যাডভাইজার এই মুহূর্তে সক্রিয় নেই। অনুগ্রহ করে আপনার API Key চেক করুন।"
-        
-        # Cache AI responses for identical queries for 1 hour
-        cache_key = f"ai_advisor_response_{query.strip().lower()}"
-        cached_response = cache_instance.get(cache_key)
-        if cached_response:
+    def _supersede(source_website: str | None, version: str):
+        """Drop answers cached under the tenant's previous context version."""
+        version_key = tenant_key("advisor_context_version", source_website)
+        previous = cache_instance.get(version_key)
+        cache_instance.set(version_key, version, ttl_seconds=AdvisorService.ANSWER_TTL_SECONDS)
+        if previous is None or previous == version:
+            return
+        keys_key = tenant_key(f"advisor_answer_keys_{previous}", source_website)
+        for key in cache_instance.get(keys_key) or ():
+            cache_instance.delete(key)
+        cache_instance.delete(keys_key)
+        semantic_cache.invalidate(tenant_key(f"advisor:{previous}", source_website))
+
+    @staticmethod
+    def _cached_answer(context: str, version: str, query: str, source_website: str | None = None):
+        cached_response = AdvisorService._answer.lookup(context, version, query, source_website)
+        if cached_response is not MISSING:
             return cached_response
+        similar_response, _ = semantic_cache.lookup(tenant_key(f"advisor:{version}", source_website), query)
+        return similar_response
 
-        context = AdvisorService.get_business_context(db)
-        
-        system_prompt = f"""
-        তুমি একজন 'AI Merchant Advisor'। তোমার কাজ হলো ব্যবসায়ীদের তাদের দোকানের ডেটা বিশ্লেষণ করে পরামর্শ দেওয়া। 
-        খুব মার্জিত এবং প্রফেশনাল বাংলায় উত্তর দাও।
+    @staticmethod
+    def _remember(context: str, version: str, query: str, source_website: str | None, answer: str):
+        ttl = AdvisorService.ANSWER_TTL_SECONDS
+        semantic_cache.store(tenant_key(f"advisor:{version}", source_website), query, answer, ttl_seconds=ttl)
+        # Remember which keys belong to this version so _supersede can evict them
+        keys_key = tenant_key(f"advisor_answer_keys_{version}", source_website)
+        keys = cache_instance.get(keys_key) or set()
+        keys.add(AdvisorService._answer.key(context, version, query, source_website))
+        cache_instance.set(keys_key, keys, ttl_seconds=ttl)
+
+    @staticmethod
+    async def _context(db: Session, source_website: str | None = None):
+        # DB aggregates run off the event loop; only the model call is awaited here
+        return await run_in_threadpool(
+            AdvisorService.get_business_context, db, source_website=source_website
+        )
+
+    @staticmethod
+    def _build_prompt(context: str, query: str):
+        return f"""
+        তুমি একজন 'AI Merchant Advisor'। তোমার কাজ হলো ব্যবসায়ীদের তাদের দোকানের ডেটা বিশ্লেষণ করে পরামর্শ দেওয়া। 
+        খুব মার্জিত এবং প্রফেশনাল বাংলায় উত্তর দাও।
         দোকানের ডেটা: {context}
         
         ব্যবসায়ীর প্রশ্ন: {query}
         
-        পরামর্শ দেওয়ার সময় ডেটা সাপোর্ট ব্যবহার করো।
+        পরামর্শ দেওয়ার সময় ডেটা সাপোর্ট ব্যবহার করো।
         """
 
+    @staticmethod
+    @cached(
+        "advisor",
+        ttl_seconds=ANSWER_TTL_SECONDS,
+        key=lambda context, version, query, source_website=None: (version, normalize_text(query), source_website),
+        flights=llm_flights, # identical questions waiting on the model share its answer
+    )
+    async def _answer(context: str, version: str, query: str, source_website: str | None = None):
+        # Reworded versions of a question already answered on the same numbers
+        similar_response, _ = await run_in_threadpool(
+            semantic_cache.lookup, tenant_key(f"advisor:{version}", source_website), query
+        )
+        if similar_response:
+            return similar_response
+        answer = await llm_client.generate("advisor", AdvisorService._build_prompt(context, query))
+        await run_in_threadpool(AdvisorService._remember, context, version, query, source_website, answer)
+        return answer
+
+    @staticmethod
+    async def ask_advisor(db: Session, query: str, source_website: str | None = None):
+        if not llm_client.available:
+            return AdvisorService.UNAVAILABLE_MESSAGE
+        
+        # Cached answers for identical (or reworded) queries on the same numbers
+        context, version = await AdvisorService._context(db, source_website)
         try:
-            response = model.generate_content(system_prompt)
-            answer = response.text
-            cache_instance.set(cache_key, answer, ttl_seconds=3600) # 1 hour cache
-            return answer
-        except Exception as e:
+            return await AdvisorService._answer(context, version, query, source_website)
+        except (LLMBusy, LLMTimeout):
+            return AdvisorService.BUSY_MESSAGE
+        except LLMError as e:
             return f"ত্রুটি: {str(e)}"
+
+    @staticmethod
+    async def stream_advisor(db: Session, query: str, source_website: str | None = None):
+        """Yield the answer in chunks as the model produces them; cached once complete."""
+        if not llm_client.available:
+            yield AdvisorService.UNAVAILABLE_MESSAGE
+            return
+
+        context, version = await AdvisorService._context(db, source_website)
+        cached_response = await run_in_threadpool(AdvisorService._cached_answer, context, version, query, source_website)
+        if cached_response:
+            yield cached_response
+            return
+
+        system_prompt = AdvisorService._build_prompt(context, query)
+        parts = []
+        try:
+            async for chunk in llm_client.stream("advisor", system_prompt):
+                parts.append(chunk)
+                yield chunk
+        except (LLMBusy, LLMTimeout):
+            yield AdvisorService.BUSY_MESSAGE
+            return
+        except LLMError as e:
+            yield f"ত্রুটি: {str(e)}"
+            return
+        answer = "".join(parts)
+        await run_in_threadpool(AdvisorService._answer.store, answer, context, version, query, source_website)
+        await run_in_threadpool(AdvisorService._remember, context, version, query, source_website, answer)
@@ -0,0 +1 @@
+# Sales Analytics Module
@@ -0,0 +1,56 @@
+"""Rebuild the analytics rollups from raw order data.
+
+The full rebuild deletes and re-inserts rollup rows that order writes also
+upsert, so run it in a maintenance window. ``--windows-only`` only moves the
+products' 7/30/90-day sold quantities along and is safe against live traffic.
+
+Usage:
+    python -m app.analytics.backfill                 # full history
+    python -m app.analytics.backfill --days 30       # only the last 30 days
+    python -m app.analytics.backfill --windows-only  # daily cron
+"""
+import argparse
+from datetime import date, timedelta
+
+import app.auth.models  # noqa: F401
+import app.users.models  # noqa: F401
+import app.products.models  # noqa: F401
+import app.orders.models  # noqa: F401
+from app.analytics import service
+from app.database import SessionLocal
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--days", type=int, default=None, help="Only rebuild the last N days"
+    )
+    mode.add_argument(
+        "--windows-only", action="store_true",
+        help="Only refresh the per-product sales windows (safe while orders come in)",
+    )
+    args = parser.parse_args(argv)
+
+    since = date.today() - timedelta(days=args.days) if args.days else None
+
+    db = SessionLocal()
+    try:
+        if args.windows_only:
+            rows = service.refresh_product_sales_windows(db)
+            print(f"products: {rows} sales windows refreshed")
+            return
+        rows = service.rebuild_daily_sales_rollup(db, since=since)
+        print(f"daily_sales_rollup: {rows} rows rebuilt")
+        rows = service.rebuild_daily_term_sales(db, since=since)
+        print(f"daily_term_sales: {rows} rows rebuilt")
+        rows = service.refresh_product_sales_windows(db)
+        print(f"products: {rows} sales windows refreshed")
+        rows = service.rebuild_customer_order_summary(db, since=since)
+        print(f"customer_order_summary: {rows} rows rebuilt")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
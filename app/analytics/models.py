@@ -0,0 +1,69 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, UniqueConstraint
+
+from app.database import Base
+
+
+class DailySalesRollup(Base):
+    """Pre-aggregated order lines per (day, district, product, source_website).
+
+    Maintained incrementally by the order write paths; rebuild with
+    ``python -m app.analytics.backfill``.
+    """
+
+    __tablename__ = "daily_sales_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "district", "product_id", "source_website",
+            name="uq_daily_sales_rollup_key",
+        ),
+        Index("ix_daily_sales_rollup_product_day", "product_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)
+    district = Column(String(100), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    source_website = Column(String(100), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    order_lines = Column(Integer, nullable=False, default=0)
+
+
+class CustomerOrderSummary(Base):
+    """Per-customer order totals, maintained on order writes (see backfill)."""
+
+    __tablename__ = "customer_order_summary"
+    __table_args__ = (
+        Index("ix_customer_order_summary_last_order", "last_order_at", "order_count"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    first_order_at = Column(DateTime, nullable=False)
+    last_order_at = Column(DateTime, nullable=False)
+    order_count = Column(Integer, nullable=False, default=0)
+    lifetime_value = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class DailyTermSales(Base):
+    """Units sold per (day, keyword or category, source_website).
+
+    Keywords come from ``app.analytics.terms.product_terms``; maintained with the
+    sales rollup and rebuilt from it by the backfill.
+    """
+
+    __tablename__ = "daily_term_sales"
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "term_type", "term", "source_website",
+            name="uq_daily_term_sales_key",
+        ),
+        Index("ix_daily_term_sales_day_term", "day", "term_type", "term"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    term_type = Column(String(20), nullable=False) # 'keyword' or 'category'
+    term = Column(String(100), nullable=False)
+    source_website = Column(String(100), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    order_lines = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,315 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import DateTime, case, delete, func, select, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.analytics.models import CustomerOrderSummary, DailySalesRollup, DailyTermSales
+from app.analytics.terms import product_terms
+from app.orders.models import Order, OrderDetail
+from app.products.models import Product
+from app.users.models import UserAddress
+from app.utils import cache_tags
+
+UNKNOWN_DISTRICT = "Unknown"
+
+_ROLLUP_KEY = ("day", "district", "product_id", "source_website")
+
+_SALES_WINDOWS = {"sold_qty_7d": 7, "sold_qty_30d": 30, "sold_qty_90d": 90}
+
+
+# ── District Resolution ───────────────────────────────────────────────
+
+def district_for_user(user_id_column):
+    """Correlated subquery: the district of a user's default (else first) address."""
+    return func.coalesce(
+        select(UserAddress.district)
+        .where(UserAddress.user_id == user_id_column)
+        .order_by(UserAddress.is_default.desc(), UserAddress.id)
+        .limit(1)
+        .scalar_subquery(),
+        UNKNOWN_DISTRICT,
+    )
+
+
+def resolve_district(db: Session, user_id: int) -> str:
+    address = (
+        db.query(UserAddress.district)
+        .filter(UserAddress.user_id == user_id)
+        .order_by(UserAddress.is_default.desc(), UserAddress.id)
+        .first()
+    )
+    return (address and address[0]) or UNKNOWN_DISTRICT
+
+
+# ── Incremental Maintenance ───────────────────────────────────────────
+
+def _upsert(
+    db: Session,
+    model,
+    key: dict,
+    increments: dict,
+    earliest: dict | None = None,
+    latest: dict | None = None,
+) -> None:
+    """Insert ``model`` at ``key`` or add ``increments`` to the existing row.
+
+    ``earliest``/``latest`` columns keep the min/max of the stored and given value.
+    """
+    earliest = earliest or {}
+    latest = latest or {}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(model).values(**key, **increments, **earliest, **latest)
+        table = model.__table__.c
+        updates = {name: table[name] + stmt.excluded[name] for name in increments}
+        updates.update({
+            name: case((stmt.excluded[name] < table[name], stmt.excluded[name]), else_=table[name])
+            for name in earliest
+        })
+        updates.update({
+            name: case((stmt.excluded[name] > table[name], stmt.excluded[name]), else_=table[name])
+            for name in latest
+        })
+        db.execute(stmt.on_conflict_do_update(index_elements=list(key), set_=updates))
+        return
+
+    row = db.query(model).filter_by(**key).with_for_update().first()
+    if row is None:
+        db.add(model(**key, **increments, **earliest, **latest))
+    else:
+        for name, value in increments.items():
+            setattr(row, name, getattr(row, name) + value)
+        for name, value in earliest.items():
+            setattr(row, name, min(getattr(row, name), value))
+        for name, value in latest.items():
+            setattr(row, name, max(getattr(row, name), value))
+    db.flush()
+
+
+def record_order_line(
+    db: Session,
+    order: Order,
+    product_id: int,
+    quantity: int,
+    revenue: Decimal,
+    order_lines: int = 1,
+    district: str | None = None,
+) -> None:
+    """Apply an order-line delta to the rollup inside the caller's transaction.
+
+    Pass negative values to retract a line (e.g. on delete or quantity change).
+    ``revenue`` should be the ``Decimal`` line amount, not a float of it.
+    """
+    key = {
+        "day": (order.created_at or datetime.now()).date(),
+        "district": district or resolve_district(db, order.user_id),
+        "product_id": product_id,
+        "source_website": order.source_website,
+    }
+    increments = {"quantity": quantity, "revenue": Decimal(revenue), "order_lines": order_lines}
+    _upsert(db, DailySalesRollup, key, increments)
+    record_term_sales(db, key["day"], product_id, order.source_website, quantity, order_lines)
+    record_product_sale(db, product_id, quantity, order.created_at or datetime.now())
+
+
+def record_product_sale(db: Session, product_id: int, quantity: int, sold_at: datetime) -> None:
+    """Apply a sold-quantity delta to the product's rolling windows and ``last_sold_at``.
+
+    Only windows that still cover ``sold_at`` change, so edits to old orders
+    don't inflate the 7-day count. A retraction never moves ``last_sold_at``
+    back; the backfill's window refresh corrects it.
+    """
+    age_days = (date.today() - sold_at.date()).days
+    values = {
+        column: getattr(Product, column) + quantity
+        for column, window in _SALES_WINDOWS.items()
+        if age_days < window
+    }
+    if quantity > 0:
+        values[Product.last_sold_at] = case(
+            (Product.last_sold_at.is_(None), sold_at),
+            (Product.last_sold_at < sold_at, sold_at),
+            else_=Product.last_sold_at,
+        )
+    if values:
+        db.query(Product).filter(Product.id == product_id).update(values, synchronize_session=False)
+
+
+def record_term_sales(
+    db: Session,
+    day: date,
+    product_id: int,
+    source_website: str,
+    quantity: int,
+    order_lines: int = 1,
+) -> None:
+    """Add an order-line delta to the product's keyword and category counters."""
+    product = db.get(Product, product_id)
+    if product is None:
+        return
+    for term_type, term in product_terms(product.product_name, product.category):
+        _upsert(
+            db,
+            DailyTermSales,
+            {"day": day, "term_type": term_type, "term": term, "source_website": source_website},
+            {"quantity": quantity, "order_lines": order_lines},
+        )
+
+
+def record_customer_order(db: Session, order: Order, orders: int, value) -> None:
+    """Apply an order (``orders=1``) or a value change (``orders=0``) to the customer summary."""
+    ordered_at = order.created_at or datetime.now()
+    _upsert(
+        db,
+        CustomerOrderSummary,
+        {"user_id": order.user_id},
+        {"order_count": orders, "lifetime_value": Decimal(value)},
+        earliest={"first_order_at": ordered_at},
+        latest={"last_order_at": ordered_at},
+    )
+
+
+# ── Backfill ──────────────────────────────────────────────────────────
+
+def rebuild_daily_sales_rollup(db: Session, since: date | None = None) -> int:
+    """Recompute rollup rows from raw order lines (all history, or from ``since``)."""
+    clear = delete(DailySalesRollup)
+    if since is not None:
+        clear = clear.where(DailySalesRollup.day >= since)
+    db.execute(clear)
+
+    lines = (
+        select(
+            func.date(Order.created_at).label("day"),
+            district_for_user(Order.user_id).label("district"),
+            OrderDetail.product_id,
+            Order.source_website,
+            OrderDetail.quantity,
+            OrderDetail.total_price,
+        )
+        .join(OrderDetail, Order.id == OrderDetail.order_id)
+    )
+    if since is not None:
+        lines = lines.where(Order.created_at >= datetime.combine(since, datetime.min.time()))
+    lines = lines.subquery()
+
+    source = select(
+        lines.c.day,
+        lines.c.district,
+        lines.c.product_id,
+        lines.c.source_website,
+        func.sum(lines.c.quantity),
+        func.sum(lines.c.total_price),
+        func.count(),
+    ).group_by(lines.c.day, lines.c.district, lines.c.product_id, lines.c.source_website)
+
+    result = db.execute(
+        DailySalesRollup.__table__.insert().from_select(
+            [*_ROLLUP_KEY, "quantity", "revenue", "order_lines"], source
+        )
+    )
+    cache_tags.bump(db, "orders")
+    db.commit()
+    return result.rowcount
+
+
+def rebuild_daily_term_sales(db: Session, since: date | None = None) -> int:
+    """Recompute keyword/category counters from the sales rollup (rebuild that first)."""
+    clear = delete(DailyTermSales)
+    if since is not None:
+        clear = clear.where(DailyTermSales.day >= since)
+    db.execute(clear)
+
+    sales = db.query(
+        DailySalesRollup.day,
+        DailySalesRollup.source_website,
+        Product.product_name,
+        Product.category,
+        func.sum(DailySalesRollup.quantity),
+        func.sum(DailySalesRollup.order_lines),
+    ).join(Product, Product.id == DailySalesRollup.product_id)
+    if since is not None:
+        sales = sales.filter(DailySalesRollup.day >= since)
+    sales = sales.group_by(
+        DailySalesRollup.day, DailySalesRollup.source_website, Product.id, Product.product_name, Product.category
+    )
+
+    totals: dict[tuple, list[int]] = {}
+    for day, source_website, name, category, quantity, order_lines in sales.yield_per(10_000):
+        for term_type, term in product_terms(name, category):
+            counts = totals.setdefault((day, term_type, term, source_website), [0, 0])
+            counts[0] += quantity
+            counts[1] += order_lines
+
+    if totals:
+        db.execute(DailyTermSales.__table__.insert(), [
+            {"day": day, "term_type": term_type, "term": term, "source_website": source_website,
+             "quantity": quantity, "order_lines": order_lines}
+            for (day, term_type, term, source_website), (quantity, order_lines) in totals.items()
+        ])
+    cache_tags.bump(db, "orders")
+    db.commit()
+    return len(totals)
+
+
+def refresh_product_sales_windows(db: Session) -> int:
+    """Recompute ``Product.last_sold_at`` and the 7/30/90-day sold quantities.
+
+    Windows come from the sales rollup; run daily so days age out of them.
+    """
+    today = date.today()
+    windows = {
+        column: select(func.coalesce(func.sum(DailySalesRollup.quantity), 0))
+        .where(DailySalesRollup.product_id == Product.id)
+        .where(DailySalesRollup.day > today - timedelta(days=window))
+        .scalar_subquery()
+        for column, window in _SALES_WINDOWS.items()
+    }
+    # Last day with sales, from the rollup's (product_id, day) index; keep the
+    # exact timestamp the write path recorded when it falls on that day
+    last_sold_day = (
+        select(func.max(DailySalesRollup.day))
+        .where(DailySalesRollup.product_id == Product.id)
+        .where(DailySalesRollup.quantity > 0)
+        .scalar_subquery()
+    )
+    last_sold_at = case(
+        (func.date(Product.last_sold_at) == last_sold_day, Product.last_sold_at),
+        else_=type_coerce(last_sold_day, DateTime),
+    )
+    result = db.execute(update(Product).values(last_sold_at=last_sold_at, **windows))
+    cache_tags.bump(db, "products")
+    db.commit()
+    return result.rowcount
+
+
+def rebuild_customer_order_summary(db: Session, since: date | None = None) -> int:
+    """Recompute customer order summaries from the orders table.
+
+    With ``since`` only customers who ordered from that day on are rebuilt
+    (over their whole history, since the summary is lifetime).
+    """
+    clear = delete(CustomerOrderSummary)
+    source = select(
+        Order.user_id,
+        func.min(Order.created_at),
+        func.max(Order.created_at),
+        func.count(Order.id),
+        func.coalesce(func.sum(Order.total_amount), 0),
+    ).group_by(Order.user_id)
+    if since is not None:
+        recent = select(Order.user_id).where(Order.created_at >= datetime.combine(since, datetime.min.time()))
+        clear = clear.where(CustomerOrderSummary.user_id.in_(recent))
+        source = source.where(Order.user_id.in_(recent))
+    db.execute(clear)
+    result = db.execute(
+        CustomerOrderSummary.__table__.insert().from_select(
+            ["user_id", "first_order_at", "last_order_at", "order_count", "lifetime_value"], source
+        )
+    )
+    cache_tags.bump(db, "orders")
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,37 @@
+import re
+
+KEYWORD = "keyword"
+CATEGORY = "category"
+
+MAX_KEYWORDS_PER_PRODUCT = 8
+
+_SPLIT = re.compile(r"[\s\-_/\\,.;:()\[\]{}&+|'\"!?*#@]+")
+_STOPWORDS = {
+    "and", "for", "with", "the", "of", "in", "on", "to", "new", "pcs", "pc", "set",
+    "size", "free", "combo", "best", "premium", "quality",
+}
+
+
+def keywords(text: str | None) -> list[str]:
+    """Lower-cased, de-duplicated trend keywords of a product name (Bengali kept as-is)."""
+    if not text:
+        return []
+    seen = []
+    for token in _SPLIT.split(text.lower()):
+        if token.isdigit() or token in _STOPWORDS:
+            continue
+        if token.isascii() and len(token) < 3:
+            continue
+        if token and token not in seen:
+            seen.append(token[:100])
+        if len(seen) == MAX_KEYWORDS_PER_PRODUCT:
+            break
+    return seen
+
+
+def product_terms(product_name: str | None, category: str | None) -> list[tuple[str, str]]:
+    """``(term_type, term)`` pairs a product's sales are counted under."""
+    terms = [(KEYWORD, keyword) for keyword in keywords(product_name)]
+    if category and category.strip():
+        terms.append((CATEGORY, category.strip().lower()[:100]))
+    return terms
@@ -0,0 +1,228 @@
+"""In-process product knowledge base for the chatbot.
+
+Price, stock, variant and shipping questions about a known product are
+answered from an inverted index over the catalog instead of the model.
+The index is refreshed incrementally: products whose ``updated_at`` is past
+the last seen watermark (minus a small overlap, for transactions that
+commit after a later one) are re-read. That covers creates, edits, soft
+deletes and sales counters. Product writes in this process also mark the
+index stale so their change shows up on the very next question; other
+workers pick it up within ``refresh_seconds``. A full rebuild every
+``rebuild_seconds`` catches anything the watermark missed.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.products.models import Product
+from app.utils.semantic_cache import VARIANT_TERMS, normalize_text, qualifiers
+
+INTENT_WORDS = {
+    "price": {"দাম", "মূল্য", "টাকা", "প্রাইস", "price", "cost", "rate", "dam", "daam"},
+    "stock": {"স্টক", "স্টকে", "available", "availability", "stock", "পাওয়া", "ache"},
+    "variant": {"সাইজ", "কালার", "রং", "রঙ", "ভ্যারিয়েন্ট", "size", "sizes", "color", "colour", "colors", "variant", "variants"},
+    "shipping": {"ডেলিভারি", "শিপিং", "delivery", "shipping", "courier", "কুরিয়ার"},
+}
+# Questions the catalog can't answer even when they mention price or stock
+ESCALATE_WORDS = {
+    "অফার", "ছাড়", "ডিসকাউন্ট", "ফেরত", "রিটার্ন", "এক্সচেঞ্জ", "কেন", "কিভাবে", "কীভাবে", "তুলনা",
+    "offer", "discount", "coupon", "return", "exchange", "refund", "why", "compare", "better",
+}
+# "how" asks for advice, except in "how much" (a price) / "how many" (stock)
+HOW_QUANTITY = {"much": "price", "many": "stock"}
+SIZE_WORDS = {"size", "সাইজ"}
+MIN_NAME_COVERAGE = 0.75 # share of a product name's (idf-weighted) words the question must contain
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+@dataclass
+class _Doc:
+    name: str
+    price: float
+    stock: int
+    min_stock: int
+    variant: str | None
+    is_active: bool
+    name_tokens: frozenset
+    tokens: frozenset
+    identifiers: frozenset # lower-cased sku / barcode
+    variant_terms: frozenset # colours and sizes named in the name, variant or category
+
+
+def _doc(product: Product) -> _Doc:
+    name_tokens = frozenset(normalize_text(product.product_name or "").split())
+    extra = " ".join(str(v) for v in (product.sku, product.barcode, product.variant, product.category) if v)
+    described = normalize_text(f"{product.product_name or ''} {extra}")
+    return _Doc(
+        name=product.product_name,
+        price=float(product.price or 0),
+        stock=product.stock_quantity or 0,
+        min_stock=product.min_stock_level or 0,
+        variant=product.variant,
+        is_active=bool(product.is_active),
+        name_tokens=name_tokens,
+        tokens=name_tokens | frozenset(normalize_text(extra).split()),
+        identifiers=frozenset(str(v).lower() for v in (product.sku, product.barcode) if v),
+        # Read every word as if after "size", so a variant list like "M, L, XL" counts its letters
+        variant_terms=qualifiers(" ".join(f"size {word}" for word in described.split())) & VARIANT_TERMS,
+    )
+
+
+def _escalates(tokens: list[str]) -> bool:
+    if ESCALATE_WORDS.intersection(tokens):
+        return True
+    return any(
+        token == "how" and (i + 1 == len(tokens) or tokens[i + 1] not in HOW_QUANTITY)
+        for i, token in enumerate(tokens)
+    )
+
+
+def _asks_other_variant(tokens: list[str], doc: "_Doc") -> bool:
+    """True when the question names a colour or size the product doesn't list.
+
+    A plain stock or price answer would silently ignore it ("available in
+    red?"), so the model, with the variant text, answers instead.
+    """
+    asked = qualifiers(" ".join(tokens)) & VARIANT_TERMS
+    if not asked <= doc.variant_terms:
+        return True
+    sizes = {tokens[i + 1] for i, token in enumerate(tokens[:-1]) if token in SIZE_WORDS and tokens[i + 1].isdigit()}
+    return not sizes <= doc.tokens
+
+
+class ProductKnowledgeBase:
+    def __init__(self, refresh_seconds: float = 30, rebuild_seconds: float = 3600):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._docs: dict[int, _Doc] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._identifiers: dict[str, int] = {}
+        self._watermark: datetime | None = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+        self._stale = True
+
+    def mark_stale(self) -> None:
+        """Called after product writes so the next question re-reads changed rows."""
+        self._stale = True
+
+    def _index(self, product_id: int, doc: _Doc | None) -> None:
+        old = self._docs.pop(product_id, None)
+        if old is not None:
+            for token in old.tokens:
+                ids = self._postings.get(token)
+                if ids is not None:
+                    ids.discard(product_id)
+                    if not ids:
+                        del self._postings[token]
+            for identifier in old.identifiers:
+                if self._identifiers.get(identifier) == product_id:
+                    del self._identifiers[identifier]
+        if doc is None:
+            return
+        self._docs[product_id] = doc
+        for token in doc.tokens:
+            self._postings.setdefault(token, set()).add(product_id)
+        for identifier in doc.identifiers:
+            self._identifiers[identifier] = product_id
+
+    def refresh(self, db: Session) -> int:
+        """Re-read products changed since the watermark; returns how many were (re)indexed."""
+        with self._lock:
+            if not self._stale and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return 0
+            self._stale = False
+            self._checked_at = time.monotonic()
+            query = db.query(Product)
+            if self._watermark is not None and self._checked_at - self._built_at < self.rebuild_seconds:
+                query = query.filter(Product.updated_at >= self._watermark - WATERMARK_OVERLAP)
+            else:
+                self._docs, self._postings, self._identifiers = {}, {}, {}
+                self._built_at = self._checked_at
+            products = query.all()
+            for product in products:
+                self._index(product.id, _doc(product))
+                if product.updated_at and (self._watermark is None or product.updated_at > self._watermark):
+                    self._watermark = product.updated_at
+            return len(products)
+
+    def _match(self, message: str, tokens: list[str]) -> int | None:
+        for word in message.lower().split():
+            product_id = self._identifiers.get(word.strip("?!.,;:()'\"।"))
+            if product_id is not None:
+                return product_id # an exact sku / barcode beats any name match
+
+        total = len(self._docs) or 1
+        scores: dict[int, float] = {}
+        for token in set(tokens):
+            ids = self._postings.get(token)
+            if not ids or len(ids) > total / 2:
+                continue # absent, or too common to tell products apart
+            weight = math.log(total / len(ids)) + 1
+            for product_id in ids:
+                if token in self._docs[product_id].name_tokens:
+                    scores[product_id] = scores.get(product_id, 0.0) + weight
+
+        best_id, best, runner_up = None, 0.0, 0.0
+        present = set(tokens)
+        for product_id in scores:
+            doc = self._docs[product_id]
+            weights = {t: math.log(total / len(self._postings[t])) + 1 for t in doc.name_tokens}
+            coverage = sum(w for t, w in weights.items() if t in present) / (sum(weights.values()) or 1)
+            if coverage > best:
+                best_id, best, runner_up = product_id, coverage, best
+            elif coverage > runner_up:
+                runner_up = coverage
+        if best >= MIN_NAME_COVERAGE and best > runner_up:
+            return best_id
+        return None
+
+    def _reply(self, intent: str, doc: _Doc) -> str | None:
+        if intent == "shipping":
+            return settings.CHATBOT_SHIPPING_INFO or None
+        if not doc.is_active:
+            return f"দুঃখিত, {doc.name} পণ্যটি বর্তমানে বিক্রি হচ্ছে না।"
+        if intent == "price":
+            return f"{doc.name}-এর দাম {doc.price:,.0f} টাকা।"
+        if intent == "stock":
+            if doc.stock <= 0:
+                return f"দুঃখিত, {doc.name} এই মুহূর্তে স্টকে নেই।"
+            if doc.stock <= doc.min_stock:
+                return f"জি, {doc.name} স্টকে আছে, তবে মাত্র {doc.stock}টি বাকি।"
+            return f"জি, {doc.name} এখন স্টকে আছে।"
+        if intent == "variant":
+            return f"{doc.name}: {doc.variant}" if doc.variant else None
+        return None
+
+    def answer(self, db: Session, message: str, product_id: int | None = None) -> str | None:
+        """Catalog answer to ``message``, or None when the model should handle it."""
+        tokens = normalize_text(message).split()
+        if not tokens or _escalates(tokens):
+            return None
+        asked = {HOW_QUANTITY[b] for a, b in zip(tokens, tokens[1:]) if a == "how" and b in HOW_QUANTITY}
+        intents = [intent for intent, words in INTENT_WORDS.items() if intent in asked or words.intersection(tokens)]
+        if not intents:
+            return None
+
+        self.refresh(db)
+        with self._lock:
+            if product_id is None and intents != ["shipping"]:
+                product_id = self._match(message, tokens)
+            doc = self._docs.get(product_id)
+            if doc is None and intents != ["shipping"]:
+                return None
+            if doc is not None and _asks_other_variant(tokens, doc):
+                return None
+            replies = [self._reply(intent, doc) for intent in intents]
+        if not all(replies):
+            return None # one part needs the model; let it answer the whole question
+        return " ".join(replies)
+
+
+product_knowledge = ProductKnowledgeBase()
@@ -1,21 +1,61 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.chatbot.schemas import ChatRequest, ChatResponse
+from app.chatbot.schemas import ChatRequest, ChatResponse, ChatSession
 from app.chatbot.service import ChatbotService
+from app.chatbot.sessions import is_issued, issue_session_id
+from app.llm.client import ClientDisconnected, cancel_on_disconnect
+from app.llm.streaming import single_chunk, sse_response
 
 router = APIRouter(
     prefix="/chatbot",
     tags=["AI Chatbot"]
 )
 
+def _check_session(request: ChatRequest):
+    if request.session_id is not None and not is_issued(request.session_id):
+        raise HTTPException(status_code=403, detail="Unknown chat session; start one with POST /chatbot/sessions")
+
+@router.post("/sessions", response_model=ChatSession)
+def start_session():
+    """
+    Start a conversation: send the returned `session_id` with follow-up questions to keep their context.
+    """
+    return {"session_id": issue_session_id()}
+
 @router.post("/ask", response_model=ChatResponse)
-def ask_chatbot(request: ChatRequest, db: Session = Depends(get_db)):
+async def ask_chatbot(request: ChatRequest, http_request: Request, db: Session = Depends(get_db)):
     """
     Ask any shipping or product related questions to the AI chatbot.
     """
-    reply = ChatbotService.get_reply(db, request.message, request.product_id)
+    _check_session(request)
+    try:
+        reply, source = await cancel_on_disconnect(
+            http_request,
+            ChatbotService.get_reply(db, request.message, request.product_id, request.session_id),
+        )
+    except ClientDisconnected:
+        return Response(status_code=499)
     return {
         "reply": reply,
-        "source": "ai"
+        "source": source,
+        "session_id": request.session_id
     }
+
+@router.post("/ask/stream")
+async def stream_chatbot(request: ChatRequest, db: Session = Depends(get_db)):
+    """
+    Streamed variant of /ask: server-sent `data: {"delta": "..."}` events, then `event: done`.
+    """
+    _check_session(request)
+    kb_reply = await ChatbotService.knowledge_reply(
+        db, request.message, request.product_id, request.session_id
+    )
+    if kb_reply:
+        return sse_response(
+            single_chunk(kb_reply), done={"source": "knowledge_base", "session_id": request.session_id}
+        )
+    return sse_response(
+        ChatbotService.stream_reply(db, request.message, request.product_id, request.session_id),
+        done={"source": "ai", "session_id": request.session_id},
+    )
@@ -1,10 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 class ChatRequest(BaseModel):
     message: str
     product_id: Optional[int] = None # If asking about a specific product
+    session_id: Optional[str] = Field(None, max_length=64) # From POST /chatbot/sessions, to keep conversation context
+
+class ChatSession(BaseModel):
+    session_id: str
 
 class ChatResponse(BaseModel):
     reply: str
     source: str # 'ai' or 'knowledge_base'
+    session_id: Optional[str] = None
@@ -1,40 +1,141 @@
-import google.generativeai as genai
-import os
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.chatbot.knowledge import product_knowledge
+from app.chatbot.sessions import ConversationHistory, conversation_store
+from app.llm.client import LLMBusy, LLMError, LLMTimeout, LLMUnavailable, llm_client
+from app.llm.coalesce import llm_flights
 from app.products.models import Product
-from app.utils.cache import cache_instance
-
-# Configure Gemini
-try:
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel('gemini-1.5-flash')
-except Exception:
-    model = None
+from app.utils.cache import MISSING, cached
+from app.utils.semantic_cache import normalize_text, semantic_cache
 
 class ChatbotService:
+    UNAVAILABLE_MESSAGE = "দুঃখিত, বর্তমানে এআই সার্ভিসটি পাওয়া যাচ্ছে না।"
+    BUSY_MESSAGE = "দুঃখিত, এই মুহূর্তে অনেক প্রশ্ন আসছে। কিছুক্ষণ পর আবার চেষ্টা করুন।"
+
+    REPLY_TTL_SECONDS = 3600
+
     @staticmethod
-    def get_reply(db: Session, message: str, product_id: int = None):
-        # Cache key based on message and product_id
-        cache_key = f"chatbot_reply_{product_id}_{message.strip().lower()}"
-        cached_reply = cache_instance.get(cache_key)
-        if cached_reply:
+    def _cached_reply(db: Session, message: str, product_id: int = None):
+        cached_reply = ChatbotService._answer.lookup(db, message, product_id)
+        if cached_reply is not MISSING:
             return cached_reply
+        # Reworded versions of an answered question about the same product
+        similar_reply, _ = semantic_cache.lookup(f"chatbot:{product_id}", message)
+        return similar_reply
+
+    @staticmethod
+    def _remember(db: Session, message: str, product_id: int, reply: str):
+        ChatbotService._answer.store(reply, db, message, product_id)
+        semantic_cache.store(f"chatbot:{product_id}", message, reply, ttl_seconds=ChatbotService.REPLY_TTL_SECONDS)
+
+    @staticmethod
+    async def _history(session_id: str | None) -> ConversationHistory | None:
+        # The store may be the shared cache backend: keep its I/O off the loop
+        return await run_in_threadpool(conversation_store.history, session_id) if session_id else None
+
+    @staticmethod
+    async def _record(session_id: str | None, message: str, reply: str):
+        if session_id:
+            await run_in_threadpool(conversation_store.append, session_id, message, reply)
 
+    @staticmethod
+    async def _build_prompt(
+        db: Session, message: str, product_id: int = None, history: ConversationHistory | None = None
+    ):
         product_context = ""
         if product_id:
-            product = db.query(Product).filter(Product.id == product_id).first()
+            product = await run_in_threadpool(
+                lambda: db.query(Product).filter(Product.id == product_id).first()
+            )
             if product:
                 product_context = f"Name:{product.product_name}, Price:{product.price}, Info:{product.variant}"
 
-        system_prompt = f"You are a helpful support agent. Reply in polite Bengali. Context: {product_context}. Input: {message}"
+        # Bounded by the conversation store's token budgets, however long the chat
+        conversation = f" Conversation so far:\n{history.render()}\n" if history else ""
+        return f"You are a helpful support agent. Reply in polite Bengali. Context: {product_context}.{conversation} Input: {message}"
+
+    @staticmethod
+    @cached(
+        "chatbot",
+        ttl_seconds=REPLY_TTL_SECONDS,
+        key=lambda db, message, product_id=None: (normalize_text(message), product_id),
+        flights=llm_flights, # identical questions waiting on the model share its answer
+    )
+    async def _answer(db: Session, message: str, product_id: int = None):
+        similar_reply, _ = await run_in_threadpool(semantic_cache.lookup, f"chatbot:{product_id}", message)
+        if similar_reply:
+            return similar_reply
+        system_prompt = await ChatbotService._build_prompt(db, message, product_id)
+        reply = await llm_client.generate("chatbot", system_prompt)
+        await run_in_threadpool(
+            semantic_cache.store, f"chatbot:{product_id}", message, reply, ttl_seconds=ChatbotService.REPLY_TTL_SECONDS
+        )
+        return reply
+
+    @staticmethod
+    async def knowledge_reply(db: Session, message: str, product_id: int = None, session_id: str = None):
+        """Answer price/stock/variant/shipping questions from the catalog index, or None."""
+        reply = await run_in_threadpool(product_knowledge.answer, db, message, product_id)
+        if reply:
+            await ChatbotService._record(session_id, message, reply)
+        return reply
+
+    @staticmethod
+    async def get_reply(db: Session, message: str, product_id: int = None, session_id: str = None):
+        """Return ``(reply, source)``; catalog facts are never served from the answer caches."""
+        kb_reply = await ChatbotService.knowledge_reply(db, message, product_id, session_id)
+        if kb_reply:
+            return kb_reply, "knowledge_base"
+
+        history = await ChatbotService._history(session_id)
+        try:
+            reply = await ChatbotService._ai_reply(db, message, product_id, history)
+        except LLMUnavailable:
+            return ChatbotService.UNAVAILABLE_MESSAGE, "ai"
+        except (LLMBusy, LLMTimeout):
+            return ChatbotService.BUSY_MESSAGE, "ai"
+        except LLMError as e:
+            return f"ত্রুটি: {str(e)}", "ai"
+        await ChatbotService._record(session_id, message, reply)
+        return reply, "ai"
+
+    @staticmethod
+    async def _ai_reply(db: Session, message: str, product_id: int = None, history: ConversationHistory | None = None):
+        if history:
+            # A follow-up only makes sense with its conversation: no shared caches
+            system_prompt = await ChatbotService._build_prompt(db, message, product_id, history)
+            return await llm_client.generate("chatbot", system_prompt)
+
+        return await ChatbotService._answer(db, message, product_id)
+
+    @staticmethod
+    async def stream_reply(db: Session, message: str, product_id: int = None, session_id: str = None):
+        """Yield the reply in chunks as the model produces them; cached once complete."""
+        history = await ChatbotService._history(session_id)
+        if not history:
+            cached_reply = await run_in_threadpool(ChatbotService._cached_reply, db, message, product_id)
+            if cached_reply:
+                await ChatbotService._record(session_id, message, cached_reply)
+                yield cached_reply
+                return
 
-        if not model:
-            return "দুঃখিত, বর্তমানে এআই সার্ভিসটি পাওয়া যাচ্ছে না।"
+        if not llm_client.available:
+            yield ChatbotService.UNAVAILABLE_MESSAGE
+            return
 
+        system_prompt = await ChatbotService._build_prompt(db, message, product_id, history)
+        parts = []
         try:
-            response = model.generate_content(system_prompt)
-            reply = response.text
-            cache_instance.set(cache_key, reply, ttl_seconds=3600) # Cache for 1 hour
-            return reply
-        except Exception as e:
-            return f"ত্রুটি: {str(e)}"
+            async for chunk in llm_client.stream("chatbot", system_prompt):
+                parts.append(chunk)
+                yield chunk
+        except (LLMBusy, LLMTimeout):
+            yield ChatbotService.BUSY_MESSAGE
+            return
+        except LLMError as e:
+            yield f"ত্রুটি: {str(e)}"
+            return
+        reply = "".join(parts)
+        if not history:
+            await run_in_threadpool(ChatbotService._remember, db, message, product_id, reply)
+        await ChatbotService._record(session_id, message, reply)
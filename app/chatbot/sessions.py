@@ -0,0 +1,173 @@
+"""Server-side chatbot conversations with a bounded prompt footprint.
+
+Each session keeps its most recent turns verbatim up to a token budget.
+Turns that fall out of that window are folded into a rolling summary that
+has its own budget, so the history added to a prompt never grows past
+``window_tokens + summary_tokens`` however long the chat runs. Compaction
+is extractive (clipped question / first sentence of the answer), so it
+costs no model call and adds no latency. Sessions expire after a TTL of
+inactivity, and the in-process store keeps at most ``max_sessions`` (least
+recently used go first), which caps its memory.
+
+With a shared ``CACHE_BACKEND`` conversations live in the shared store, so
+a follow-up can land on any worker; otherwise each worker keeps its own and
+sessions need sticky routing.
+
+Session ids are issued by the server (``issue_session_id``): a random token
+signed with ``SECRET_KEY``. Holding one is what grants access to its
+conversation, and any worker can tell an issued id from one a client made
+up without a shared registry.
+"""
+import base64
+import hashlib
+import hmac
+import re
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.utils.cache import LRUCache, cache_instance
+from app.utils.shared_cache import TieredCache
+
+SUMMARY_LINE_CHARS = 160
+_SENTENCE_END = re.compile(r"(?<=[।.!?])\s")
+
+
+def _signature(token: str) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_session_id() -> str:
+    """A new, unguessable conversation id (47 characters)."""
+    token = secrets.token_urlsafe(18)
+    return f"{token}.{_signature(token)}"
+
+
+def is_issued(session_id: str) -> bool:
+    """True for ids from ``issue_session_id``; client-chosen or altered ids fail."""
+    token, _, signature = session_id.partition(".")
+    return bool(token) and hmac.compare_digest(signature, _signature(token))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English, closer to 3 for Bengali script
+    return max(1, len(text) // 3)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+@dataclass
+class _Turn:
+    role: str # 'user' or 'assistant'
+    text: str
+    tokens: int
+
+
+@dataclass
+class _Session:
+    turns: deque = field(default_factory=deque)
+    turn_tokens: int = 0
+    summary: deque = field(default_factory=deque) # compacted lines, oldest first
+    summary_tokens: int = 0
+
+
+@dataclass
+class ConversationHistory:
+    summary: str
+    turns: list[tuple[str, str]]
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def render(self) -> str:
+        lines = []
+        if self.summary:
+            lines.append(f"Earlier in this conversation: {self.summary}")
+        lines.extend(f"{'Customer' if role == 'user' else 'Agent'}: {text}" for role, text in self.turns)
+        return "\n".join(lines)
+
+
+class ConversationStore:
+    """Sessions in ``cache`` (any ``LRUCache``-like store), keyed by session id.
+
+    Each append rewrites the whole session with a fresh TTL. Two appends to
+    one session from different workers at the same instant can drop one of
+    the turns; a chat client sends one message at a time, so that's accepted.
+    """
+
+    def __init__(
+        self,
+        window_tokens: int = settings.CHAT_SESSION_WINDOW_TOKENS,
+        summary_tokens: int = settings.CHAT_SESSION_SUMMARY_TOKENS,
+        ttl_seconds: int = settings.CHAT_SESSION_TTL_SECONDS,
+        max_sessions: int = settings.CHAT_SESSION_MAX_SESSIONS,
+        cache: LRUCache | TieredCache | None = None,
+    ):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = cache if cache is not None else LRUCache(max_entries=max_sessions)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"chat_session:{session_id}"
+
+    def history(self, session_id: str) -> ConversationHistory:
+        with self._lock: # the in-process store hands out the session append mutates
+            session = self._sessions.get(self._key(session_id))
+            if session is None:
+                return ConversationHistory("", [])
+            return ConversationHistory(
+                " ".join(session.summary), [(turn.role, turn.text) for turn in session.turns]
+            )
+
+    def append(self, session_id: str, message: str, reply: str) -> None:
+        """Record one question/answer exchange, compacting the oldest turns as needed."""
+        key = self._key(session_id)
+        with self._lock:
+            session = self._sessions.get(key) or _Session()
+
+            # A single oversized message can't take more than half the window
+            limit = self.window_tokens * 3 // 2
+            for role, text in (("user", message), ("assistant", reply)):
+                text = _clip(text, limit)
+                turn = _Turn(role, text, estimate_tokens(text))
+                session.turns.append(turn)
+                session.turn_tokens += turn.tokens
+            while session.turn_tokens > self.window_tokens and session.turns:
+                self._compact(session, session.turns.popleft())
+            self._sessions.set(key, session, ttl_seconds=self.ttl_seconds)
+
+    def _compact(self, session: _Session, turn: _Turn) -> None:
+        session.turn_tokens -= turn.tokens
+        if turn.role == "user":
+            line = f"Customer asked: {_clip(turn.text, SUMMARY_LINE_CHARS)}"
+        else:
+            first_sentence = _SENTENCE_END.split(turn.text.strip(), maxsplit=1)[0]
+            line = f"Agent said: {_clip(first_sentence, SUMMARY_LINE_CHARS)}"
+        session.summary.append(line)
+        session.summary_tokens += estimate_tokens(line)
+        while session.summary_tokens > self.summary_tokens and len(session.summary) > 1:
+            session.summary_tokens -= estimate_tokens(session.summary.popleft())
+
+    def stats(self) -> dict:
+        return {"max_sessions": self.max_sessions, "store": self._sessions.stats()}
+
+
+def _build_store() -> ConversationStore:
+    if isinstance(cache_instance, TieredCache):
+        # Shared across workers, without an L1 copy: another worker may have
+        # added a turn since this one last read the session
+        return ConversationStore(cache=TieredCache(cache_instance.store, l1_ttl_seconds=0))
+    return ConversationStore()
+
+
+conversation_store = _build_store()
@@ -6,6 +6,39 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    INSIGHT_GENERATOR_WORKERS: int = 8
+    INSIGHT_GENERATOR_TIMEOUT_SECONDS: float = 10.0
+    LLM_PROVIDER: str = "gemini" # 'gemini', or 'fake' for offline load tests
+    LLM_MODEL: str = "gemini-1.5-flash"
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_FEATURE_CONCURRENCY: dict[str, int] = {"advisor": 4, "chatbot": 8, "sentiment": 2}
+    LLM_TIMEOUT_SECONDS: float = 20.0
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_FAKE_LATENCY_SECONDS: float = 0.5
+    LLM_FAKE_TOKENS_PER_SECOND: float = 50.0 # 0 returns the whole answer right after the latency
+    LLM_FAKE_OUTPUT_TOKENS: int = 40
+    LLM_FAKE_FAILURE_RATE: float = 0.0 # share of calls that fail with a retryable error
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024 # approximate; least recently used entries go first
+    CACHE_SWEEP_INTERVAL_SECONDS: float = 60.0 # background removal of expired entries
+    CACHE_BACKEND: str = "memory" # 'memory' (per worker), 'sqlite' (one host) or 'redis' (shared)
+    CACHE_URL: str = "" # sqlite file path or redis://[:password@]host:port/db
+    CACHE_L1_TTL_SECONDS: float = 5.0 # in-process copy of shared entries; bounds cross-worker staleness
+    CACHE_L2_TIMEOUT_SECONDS: float = 0.25
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+    SEMANTIC_CACHE_THRESHOLD: float = 0.85 # cosine similarity needed to reuse a cached answer
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 512 # per product / tenant namespace
+    SEMANTIC_CACHE_MAX_NAMESPACES: int = 2048 # products / tenant context versions kept
+    SENTIMENT_LABEL_BATCH_SIZE: int = 40 # reviews labeled per model call
+    SENTIMENT_SUMMARY_CHUNK_SIZE: int = 100 # reviews condensed per map step of the summary
+    SENTIMENT_LEXICON_MIN_CONFIDENCE: float = 0.5 # below this the model labels the review
+    CHATBOT_SHIPPING_INFO: str | None = None # canned delivery answer; unset sends shipping questions to the model
+    CHAT_SESSION_WINDOW_TOKENS: int = 600 # recent turns kept verbatim per conversation
+    CHAT_SESSION_SUMMARY_TOKENS: int = 200 # rolling summary of older turns
+    CHAT_SESSION_TTL_SECONDS: int = 1800 # idle conversations are dropped after this
+    CHAT_SESSION_MAX_SESSIONS: int = 5000 # least recently used conversations are dropped beyond this
 
     model_config = {
         "env_file": ".env",
@@ -1,7 +1,9 @@
 import requests
 from bs4 import BeautifulSoup
 from sqlalchemy.orm import Session
+from app.chatbot.knowledge import product_knowledge
 from app.products.models import Product
+from app.utils import cache_tags
 import random
 
 class ExternalConnector:
@@ -25,7 +27,9 @@ class ExternalConnector:
                     stock_quantity=random.randint(10, 50)
                 )
                 db.add(new_prod)
+        cache_tags.bump(db, "products", source_website="Sailor")
         db.commit()
+        product_knowledge.mark_stale()
         return f"Synced {len(new_items)} items from Sailor"
 
     @staticmethod
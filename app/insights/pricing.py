@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.analytics.models import DailySalesRollup
+from app.products.models import Product, ProductPriceHistory
+
+
+@dataclass
+class ElasticityEstimate:
+    elasticity: np.ndarray     # d log(1 + qty) / d log(price), NaN when not identifiable
+    r_squared: np.ndarray
+    observations: np.ndarray   # days with a known price
+
+
+def estimate_elasticities(price: np.ndarray, quantity: np.ndarray) -> ElasticityEstimate:
+    """Fit log(1 + qty) = a + e * log(price) for every product (row) at once.
+
+    ``price`` and ``quantity`` are products x days matrices; NaN prices mark
+    days without a known price and are excluded from that row's regression.
+    """
+    mask = np.isfinite(price) & (price > 0)
+    n = mask.sum(axis=1)
+    x = np.where(mask, np.log(np.where(mask, price, 1.0)), 0.0)
+    y = np.where(mask, np.log1p(quantity), 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = x.sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0.0)
+        dy = np.where(mask, y - y_mean[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+
+        identifiable = (n >= 3) & (sxx > 1e-8)
+        elasticity = np.where(identifiable, sxy / sxx, np.nan)
+        r_squared = np.where(identifiable & (syy > 0), sxy * sxy / (sxx * syy), 0.0)
+
+    return ElasticityEstimate(elasticity, r_squared, n)
+
+
+def suggest_prices(
+    current_price: np.ndarray,
+    estimate: ElasticityEstimate,
+    min_observations: int = 14,
+    max_step: float = 0.10,
+    max_abs_elasticity: float = 5.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return (suggested_price, confidence) per product.
+
+    Inelastic products (e > -1) earn more at a higher price, elastic ones at a
+    lower price; the step shrinks as e approaches -1 and is capped at
+    ``max_step``. Confidence combines fit quality with how much history backs it.
+    """
+    e = estimate.elasticity
+    # Fits far outside the range seen in retail are noise, not a pricing signal
+    known = np.isfinite(e) & (np.abs(e) <= max_abs_elasticity)
+    with np.errstate(invalid="ignore"):
+        step = np.where(
+            e > -1.0,
+            max_step * np.clip(1.0 + e, 0.0, 1.0),   # inelastic: raise
+            -max_step * np.clip(-(1.0 + e), 0.0, 1.0),  # elastic: lower
+        )
+    step = np.where(known, step, 0.0)
+
+    coverage = np.clip(estimate.observations / (2.0 * min_observations), 0.0, 1.0)
+    confidence = np.where(
+        known & (estimate.observations >= min_observations), estimate.r_squared * coverage, 0.0
+    )
+    suggested = np.round(current_price * (1.0 + step), 0)
+    return suggested, confidence
+
+
+def load_price_quantity_matrices(
+    db: Session,
+    lookback_days: int = 60,
+    source_website: str | None = None,
+):
+    """Build products x days price and quantity matrices from the rollup and price history.
+
+    Days with sales use the realized average unit price (revenue / qty); other
+    days fall back to the catalog price in effect, forward-filled from
+    ``product_price_history`` and defaulting to the current price.
+    Returns ``(product_ids, names, current_price, price, quantity)``.
+    """
+    start = date.today() - timedelta(days=lookback_days - 1)
+
+    products = db.query(Product.id, Product.product_name, Product.price)\
+        .filter(Product.is_active == True)
+    if source_website:
+        products = products.filter(Product.source_website == source_website)
+    products = products.order_by(Product.id).all()
+    if not products:
+        empty = np.zeros((0, lookback_days))
+        return np.zeros(0, dtype=np.int64), [], np.zeros(0), empty, empty
+
+    product_ids = np.fromiter((p[0] for p in products), dtype=np.int64, count=len(products))
+    names = [p[1] for p in products]
+    current_price = np.fromiter((float(p[2]) for p in products), dtype=float, count=len(products))
+    shape = (len(products), lookback_days)
+
+    # Catalog price in effect per day (forward fill of the price history):
+    # changes inside the window, seeded by each product's last change before it
+    catalog = np.full(shape, np.nan)
+    window_start = datetime.combine(start, datetime.min.time())
+    last_before = db.query(
+        ProductPriceHistory.product_id, func.max(ProductPriceHistory.recorded_at).label("recorded_at")
+    ).filter(ProductPriceHistory.recorded_at < window_start)\
+        .group_by(ProductPriceHistory.product_id).subquery()
+    seed = db.query(
+        ProductPriceHistory.product_id, ProductPriceHistory.recorded_at, ProductPriceHistory.price
+    ).join(
+        last_before,
+        (last_before.c.product_id == ProductPriceHistory.product_id)
+        & (last_before.c.recorded_at == ProductPriceHistory.recorded_at),
+    ).join(Product, Product.id == ProductPriceHistory.product_id)
+    changes = db.query(
+        ProductPriceHistory.product_id, ProductPriceHistory.recorded_at, ProductPriceHistory.price
+    ).join(Product, Product.id == ProductPriceHistory.product_id)\
+        .filter(ProductPriceHistory.recorded_at >= window_start)
+    if source_website:
+        seed = seed.filter(Product.source_website == source_website)
+        changes = changes.filter(Product.source_website == source_website)
+    history = seed.order_by(ProductPriceHistory.id).all() \
+        + changes.order_by(ProductPriceHistory.recorded_at, ProductPriceHistory.id).all()
+    if history:
+        rows, found = _row_index(product_ids, [h[0] for h in history])
+        days = np.clip([(h[1].date() - start).days for h in history], 0, lookback_days - 1)
+        prices = np.array([float(h[2]) for h in history])
+        # Later changes on the same day overwrite earlier ones (history is time-ordered)
+        catalog[rows[found], days[found]] = prices[found]
+    filled_idx = np.where(np.isfinite(catalog), np.arange(lookback_days), 0)
+    np.maximum.accumulate(filled_idx, axis=1, out=filled_idx)
+    catalog = catalog[np.arange(shape[0])[:, None], filled_idx]
+    catalog = np.where(np.isfinite(catalog), catalog, current_price[:, None])
+
+    # Realized sales per day
+    quantity = np.zeros(shape)
+    revenue = np.zeros(shape)
+    sales = db.query(
+        DailySalesRollup.product_id,
+        DailySalesRollup.day,
+        func.sum(DailySalesRollup.quantity),
+        func.sum(DailySalesRollup.revenue),
+    ).filter(DailySalesRollup.day >= start)
+    if source_website:
+        sales = sales.filter(DailySalesRollup.source_website == source_website)
+    sales = sales.group_by(DailySalesRollup.product_id, DailySalesRollup.day).all()
+    if sales:
+        rows, found = _row_index(product_ids, [r[0] for r in sales])
+        days = np.array([(r[1] - start).days for r in sales])
+        quantity[rows[found], days[found]] = np.array([float(r[2]) for r in sales])[found]
+        revenue[rows[found], days[found]] = np.array([float(r[3]) for r in sales])[found]
+
+    sold = quantity > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        realized = np.where(sold, revenue / quantity, np.nan)
+        ratio = realized / catalog
+    # Scale the catalog price by each product's typical realized/catalog ratio so
+    # standing discounts don't read as a price change on no-sale days
+    ratio = np.sort(np.where(sold, ratio, np.inf), axis=1)
+    n_sold = sold.sum(axis=1)
+    median_ratio = ratio[np.arange(shape[0]), np.maximum(n_sold - 1, 0) // 2]
+    median_ratio = np.where(n_sold > 0, median_ratio, 1.0)
+    price = np.where(sold, realized, catalog * median_ratio[:, None])
+    # Days before the first sale in the window say nothing about demand at that price
+    before_first_sale = np.cumsum(sold, axis=1) == 0
+    price[before_first_sale] = np.nan
+    return product_ids, names, current_price, price, quantity
+
+
+def _row_index(product_ids: np.ndarray, ids) -> tuple[np.ndarray, np.ndarray]:
+    """Map ids to rows of the sorted ``product_ids``; the mask flags ids that were found."""
+    ids = np.asarray(ids, dtype=np.int64)
+    rows = np.searchsorted(product_ids, ids)
+    rows = np.minimum(rows, len(product_ids) - 1)
+    return rows, product_ids[rows] == ids
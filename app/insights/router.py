@@ -1,11 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
-from datetime import datetime
 
 from app.database import get_db
 from app.insights.service import InsightService
-from app.insights.schemas import InsightResponse, InsightBase
+from app.insights.schemas import InsightResponse, InsightBase, PricingSignalInsight, SourcingInsight
 
 router = APIRouter(
     prefix="/insights",
@@ -13,24 +12,64 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=InsightResponse)
-def get_ai_insights(db: Session = Depends(get_db)):
+def get_ai_insights(
+    source_website: str | None = Query(None),
+    db: Session = Depends(get_db)
+):
     """
     Get all AI generated insights for the merchant.
     Includes Smart Ad Target, Pricing Signals, Sourcing Guide, and Personalized Offers.
     """
     try:
-        insights = InsightService.get_all_insights(db)
-        return {
-            "insights": insights,
-            "generated_at": datetime.now()
-        }
+        return InsightService.get_insight_snapshot(db, source_website)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/marketing", response_model=List[InsightBase])
-def get_marketing_insights(db: Session = Depends(get_db)):
-    return InsightService.get_ad_target_insights(db)
+def get_marketing_insights(
+    window_days: int = Query(3, ge=1, le=30),
+    growth_threshold: float = Query(1.5, gt=0),
+    source_website: str | None = Query(None),
+    db: Session = Depends(get_db)
+):
+    return InsightService.get_ad_target_insights(
+        db,
+        window_days=window_days,
+        growth_threshold=growth_threshold,
+        source_website=source_website,
+    )
 
-@router.get("/pricing", response_model=List[InsightBase])
-def get_pricing_signals(db: Session = Depends(get_db)):
-    return InsightService.get_pricing_signals(db)
+@router.get("/pricing", response_model=List[PricingSignalInsight])
+def get_pricing_signals(
+    source_website: str | None = Query(None),
+    db: Session = Depends(get_db)
+):
+    return InsightService.get_pricing_signals(db, source_website=source_website)
+
+@router.get("/sourcing", response_model=List[SourcingInsight])
+def get_sourcing_guide(
+    window_days: int = Query(7, ge=1, le=30),
+    limit: int = Query(3, ge=1, le=20),
+    source_website: str | None = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Fastest-growing product keywords and categories.
+    """
+    return InsightService.get_sourcing_guide(
+        db, source_website=source_website, window_days=window_days, limit=limit
+    )
+
+@router.get("/offers", response_model=List[InsightBase])
+def get_personalized_offers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    source_website: str | None = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Lapsed loyal customers ranked by lifetime value, paginated.
+    """
+    return InsightService.get_personalized_offers(
+        db, skip=skip, limit=limit, source_website=source_website
+    )
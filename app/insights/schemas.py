@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class InsightBase(BaseModel):
@@ -18,6 +18,8 @@ class PricingSignalInsight(InsightBase):
     current_price: float
     suggested_price: float
     reason: str
+    elasticity: Optional[float] = None
+    confidence: float = 0.0 # 0..1, fit quality weighted by history length
 
 class SourcingInsight(InsightBase):
     item_category: str
@@ -27,3 +29,6 @@ class SourcingInsight(InsightBase):
 class InsightResponse(BaseModel):
     insights: List[InsightBase]
     generated_at: datetime
+    data_age_seconds: float = 0.0 # How old the cached insight set is
+    generator_timings_ms: Dict[str, float] = {}
+    failed_generators: List[str] = [] # Timed out or errored; insights are partial
@@ -1,134 +1,225 @@
+import logging
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
-import pandas as pd
-from app.orders.models import Order, OrderDetail
+from sqlalchemy import Float, case, cast, func, desc, text
+from datetime import date, datetime, timedelta
+from app.analytics.models import CustomerOrderSummary, DailySalesRollup, DailyTermSales
+from app.config import settings
+from app.database import SessionLocal
 from app.products.models import Product
-from app.users.models import User, UserAddress
-from app.insights.schemas import InsightBase
-from app.utils.cache import cache_instance
+from app.users.models import User
+from app.insights.pricing import estimate_elasticities, load_price_quantity_matrices, suggest_prices
+from app.insights.schemas import InsightBase, PricingSignalInsight, SourcingInsight
+from app.utils import cache_tags
+from app.utils.cache import tenant_key
+from app.utils.refresher import refresher
+
+logger = logging.getLogger(__name__)
+
+_generator_pool = ThreadPoolExecutor(
+    max_workers=settings.INSIGHT_GENERATOR_WORKERS, thread_name_prefix="insight-generator"
+)
+_runs_lock = threading.Lock()
+_runs: dict[tuple[str, str | None], "_GeneratorRun"] = {}
+
+
+class _GeneratorRun:
+    """One generator execution on the pool; its timeout clock starts when a worker picks it up.
+
+    A run that outlives its timeout cannot be interrupted, so it stays
+    registered until it finishes and later refreshes wait on it instead of
+    submitting the same query again. Abandoned work is therefore bounded to
+    one run per generator and tenant, and on PostgreSQL the statement timeout
+    ends it shortly after the caller gave up.
+    """
+
+    def __init__(self, generator, source_website: str | None):
+        self.started = threading.Event()
+        self.started_at = 0.0
+        self.future = _generator_pool.submit(self._run, generator, source_website)
+
+    def _run(self, generator, source_website):
+        self.started_at = time.monotonic()
+        self.started.set()
+        db = SessionLocal()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                timeout_ms = int(settings.INSIGHT_GENERATOR_TIMEOUT_SECONDS * 2000)
+                db.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+            return generator(db, source_website=source_website), time.monotonic() - self.started_at
+        finally:
+            db.close()
+
+    def result(self, timeout: float):
+        """Wait up to ``timeout`` for a worker, then up to ``timeout`` from the moment it started."""
+        if not self.started.wait(timeout) and self.future.cancel():
+            raise FutureTimeoutError()
+        self.started.wait()
+        return self.future.result(timeout=max(0.0, self.started_at + timeout - time.monotonic()))
+
+
+def _start_generator(name: str, generator, source_website: str | None) -> _GeneratorRun:
+    with _runs_lock:
+        run = _runs.get((name, source_website))
+        if run is None or run.future.done():
+            run = _runs[(name, source_website)] = _GeneratorRun(generator, source_website)
+        return run
+
 
 class InsightService:
     @staticmethod
-    def get_ad_target_insights(db: Session):
-        # Compare last 3 days vs previous 3 days
-        now = datetime.now()
-        three_days_ago = now - timedelta(days=3)
-        six_days_ago = now - timedelta(days=6)
+    def get_ad_target_insights(
+        db: Session,
+        window_days: int = 3,
+        growth_threshold: float = 1.5,
+        source_website: str | None = None,
+    ):
+        # Compare the last `window_days` days vs the window before it in one grouped aggregate
+        today = date.today()
+        recent_start = today - timedelta(days=window_days - 1)
+        previous_start = recent_start - timedelta(days=window_days)
+
+        recent_q = func.sum(case((DailySalesRollup.day >= recent_start, DailySalesRollup.quantity), else_=0))
+        prev_q = func.sum(case((DailySalesRollup.day < recent_start, DailySalesRollup.quantity), else_=0))
+        growth = case(
+            (prev_q > 0, cast(recent_q, Float) / prev_q),
+            (recent_q >= 2, cast(recent_q, Float)), # New demand: if it was 0 and now 2, we say it's 2x
+            else_=0.0
+        )
 
-        # Fetch data for the last 6 days
         query = db.query(
-            Order.created_at,
-            UserAddress.district,
+            DailySalesRollup.district,
             Product.product_name,
-            OrderDetail.quantity
-        ).join(OrderDetail, Order.id == OrderDetail.order_id)\
-         .join(Product, OrderDetail.product_id == Product.id)\
-         .join(User, Order.user_id == User.id)\
-         .join(UserAddress, User.id == UserAddress.user_id)\
-         .filter(Order.created_at >= six_days_ago)
-        
-        results = query.all()
-        if not results:
-            return []
+            growth.label('growth')
+        ).join(Product, DailySalesRollup.product_id == Product.id)\
+         .filter(DailySalesRollup.day >= previous_start)
+        if source_website:
+            query = query.filter(DailySalesRollup.source_website == source_website)
+        query = query.group_by(DailySalesRollup.district, Product.id, Product.product_name)\
+         .having(growth >= growth_threshold)\
+         .order_by(desc('growth'))
 
-        # Convert to DataFrame for analysis
-        df = pd.DataFrame(results, columns=['created_at', 'district', 'product_name', 'quantity'])
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        
-        recent_df = df[df['created_at'] >= three_days_ago]
-        prev_df = df[(df['created_at'] < three_days_ago) & (df['created_at'] >= six_days_ago)]
-        
-        recent_grouped = recent_df.groupby(['district', 'product_name'])['quantity'].sum().reset_index()
-        prev_grouped = prev_df.groupby(['district', 'product_name'])['quantity'].sum().reset_index()
-        
-        # Merge to compare
-        merged = pd.merge(recent_grouped, prev_grouped, on=['district', 'product_name'], how='left', suffixes=('_recent', '_prev')).fillna(0)
-        
         insights = []
-        for _, row in merged.iterrows():
-            recent_q = row['quantity_recent']
-            prev_q = row['quantity_prev']
-            
-            growth = 0
-            if prev_q > 0:
-                growth = recent_q / prev_q
-            elif recent_q >= 2: # Significant enough for new demand
-                growth = recent_q # If it was 0 and now 2, we say it's 2x for simplicity
-            
-            if growth >= 1.5: # 1.5x growth threshold
-                region = row['district'] or "Unknown"
-                insights.append(InsightBase(
-                    title="স্মার্ট অ্যাড টার্গেট (Smart Ad Target)",
-                    message=f"ভাই, গত ৩ দিনে {row['product_name']} এর চাহিদা {region} অঞ্চলে {int(growth)} গুণ বেড়েছে। আপনি আপনার ফেসবুক অ্যাড শুধু {region} তে চালান, সেল নিশ্চিত!",
-                    category="marketing",
-                    priority="high"
-                ))
+        for district, product_name, growth_rate in query.all():
+            region = district or "Unknown"
+            insights.append(InsightBase(
+                title="স্মার্ট অ্যাড টার্গেট (Smart Ad Target)",
+                message=f"ভাই, গত {window_days} দিনে {product_name} এর চাহিদা {region} অঞ্চলে {int(growth_rate)} গুণ বেড়েছে। আপনি আপনার ফেসবুক অ্যাড শুধু {region} তে চালান, সেল নিশ্চিত!",
+                category="marketing",
+                priority="high"
+            ))
         
         return insights
 
     @staticmethod
-    def get_pricing_signals(db: Session):
-        # Implementation for Dynamic Pricing
-        # High sales velocity but price could be optimized
-        # For now, a mock logic based on high recent sales
-        now = datetime.now()
-        one_week_ago = now - timedelta(days=7)
-        
-        query = db.query(
-            Product.id,
-            Product.product_name,
-            Product.price,
-            func.sum(OrderDetail.quantity).label('total_sales')
-        ).join(OrderDetail, Product.id == OrderDetail.product_id)\
-         .join(Order, OrderDetail.order_id == Order.id)\
-         .filter(Order.created_at >= one_week_ago)\
-         .group_by(Product.id, Product.product_name, Product.price)\
-         .order_by(desc('total_sales'))\
-         .limit(5)
-        
-        results = query.all()
+    def get_pricing_signals(
+        db: Session,
+        source_website: str | None = None,
+        limit: int = 5,
+        min_confidence: float = 0.3,
+    ):
+        # Dynamic pricing: per-product price elasticity fitted over the whole
+        # catalog in one vectorized pass, ranked by confidence x weekly revenue
+        product_ids, names, current_price, price, quantity = load_price_quantity_matrices(
+            db, source_website=source_website
+        )
+        estimate = estimate_elasticities(price, quantity)
+        suggested, confidence = suggest_prices(current_price, estimate)
+
+        weekly_revenue = (np.nan_to_num(price[:, -7:]) * quantity[:, -7:]).sum(axis=1)
+        candidates = np.flatnonzero((confidence >= min_confidence) & (suggested != current_price))
+        ranked = candidates[np.argsort(-(confidence[candidates] * weekly_revenue[candidates]), kind="stable")]
+
         insights = []
-        for prod_id, name, price, sales in results:
-            if sales > 10: # Arbitrary high sales threshold
-                insights.append(InsightBase(
-                    title="ডাইনামিক প্রাইসিং সিগন্যাল (Max Profit)",
-                    message=f"বর্তমানে {name} প্রোডাক্টের ডিমান্ড খুব হাই (সপ্তাহে {sales}টি সেল)। আপনি এটার দাম ২০ টাকা বাড়িয়েও বেশি সেল করতে পারবেন।",
-                    category="pricing",
-                    priority="medium"
-                ))
+        for i in ranked[:limit]:
+            e = float(estimate.elasticity[i])
+            direction = "বাড়িয়ে" if suggested[i] > current_price[i] else "কমিয়ে"
+            insights.append(PricingSignalInsight(
+                title="ডাইনামিক প্রাইসিং সিগন্যাল (Max Profit)",
+                message=f"{names[i]} এর দাম ৳{current_price[i]:.0f} থেকে {direction} ৳{suggested[i]:.0f} করলে আয় বাড়তে পারে (আস্থা {confidence[i]:.0%})।",
+                category="pricing",
+                priority="high" if confidence[i] >= 0.6 else "medium",
+                product_id=int(product_ids[i]),
+                current_price=float(current_price[i]),
+                suggested_price=float(suggested[i]),
+                reason=f"{'Inelastic' if e > -1 else 'Elastic'} demand (elasticity {e:.2f})",
+                elasticity=round(e, 3),
+                confidence=round(float(confidence[i]), 3),
+            ))
         return insights
 
     @staticmethod
-    def get_sourcing_guide(db: Session):
-        # Sourcing report - In a real app, this would query external trends or aggregate cat growth
-        # For now, we look at the highest growing product name keywords
-        return [
-            InsightBase(
+    def get_sourcing_guide(
+        db: Session,
+        source_website: str | None = None,
+        window_days: int = 7,
+        baseline_days: int = 28,
+        min_recent_units: int = 5,
+        limit: int = 3,
+    ):
+        # Winning Product Finder: keywords/categories whose sales in the last
+        # `window_days` outpace their baseline rate, from the daily term counters.
+        # The growth score is smoothed with a pseudo-count so a jump from 1 to 3
+        # units does not outrank a steady climb from 100 to 180.
+        prior = 5.0
+        recent_start = date.today() - timedelta(days=window_days - 1)
+        baseline_start = recent_start - timedelta(days=baseline_days)
+
+        recent_q = func.sum(case((DailyTermSales.day >= recent_start, DailyTermSales.quantity), else_=0))
+        baseline_q = func.sum(case((DailyTermSales.day < recent_start, DailyTermSales.quantity), else_=0))
+        expected_q = cast(baseline_q, Float) * window_days / baseline_days
+        score = (cast(recent_q, Float) + prior) / (expected_q + prior)
+
+        query = db.query(
+            DailyTermSales.term_type,
+            DailyTermSales.term,
+            recent_q.label('recent'),
+            score.label('score')
+        ).filter(DailyTermSales.day >= baseline_start)
+        if source_website:
+            query = query.filter(DailyTermSales.source_website == source_website)
+        query = query.group_by(DailyTermSales.term_type, DailyTermSales.term)\
+         .having(recent_q >= min_recent_units)\
+         .having(score >= 1.2)\
+         .order_by(desc('score'), desc('recent'))\
+         .limit(limit)
+
+        insights = []
+        for term_type, term, recent, growth in query.all():
+            label = "ক্যাটাগরির" if term_type == "category" else "ধরনের"
+            growth_pct = (growth - 1) * 100
+            insights.append(SourcingInsight(
                 title="পণ্য সোর্সিং গাইড (Winning Product Finder)",
-                message="আগামী ১৫ দিনে বাংলাদেশে হালকা কালারের লিনেন কাপড়ের ডিমান্ড তুঙ্গে থাকবে। আপনি এটি স্টক করতে পারেন। ব্যবসায়ীর টাকা অবিক্রীত পণ্যে আটকে থাকবে না।",
+                message=f"গত {window_days} দিনে '{term}' {label} পণ্যের বিক্রি ({recent}টি) আগের গড়ের তুলনায় {growth_pct:.0f}% বেশি। চাহিদা থাকতে থাকতে এটি স্টক করুন, ব্যবসায়ীর টাকা অবিক্রীত পণ্যে আটকে থাকবে না।",
                 category="sourcing",
-                priority="high"
-            )
-        ]
+                priority="high" if growth >= 2 else "medium",
+                item_category=term,
+                expected_demand_growth=f"{growth_pct:.0f}%",
+                timeframe=f"last {window_days} days vs previous {baseline_days}",
+            ))
+        return insights
 
     @staticmethod
-    def get_personalized_offers(db: Session):
+    def get_personalized_offers(
+        db: Session, skip: int = 0, limit: int = 5, source_website: str | None = None
+    ):
         # Logic to find "At-Risk" loyal customers (Churn Prediction)
         thirty_days_ago = datetime.now() - timedelta(days=30)
         
-        # Get user IDs who Haven't ordered in 30 days
+        # Customers with at least 2 orders whose last order is older than 30 days,
+        # most valuable first (range scan on the customer summary index)
         try:
-            recent_user_orders = db.query(Order.user_id).filter(Order.created_at >= thirty_days_ago).distinct().all()
-            recent_user_ids = [r[0] for r in recent_user_orders]
-
-            # Find users not in recent list but have at least 2 orders total
-            lapsed_loyal_users = db.query(User.name, func.count(Order.id).label('order_count'))\
-                .join(Order, User.id == Order.user_id)\
-                .filter(~User.id.in_(recent_user_ids))\
-                .group_by(User.id, User.name)\
-                .having(func.count(Order.id) >= 2)\
-                .limit(5).all()
+            query = db.query(User.name, CustomerOrderSummary.order_count)\
+                .join(User, User.id == CustomerOrderSummary.user_id)\
+                .filter(CustomerOrderSummary.last_order_at < thirty_days_ago)\
+                .filter(CustomerOrderSummary.order_count >= 2)
+            if source_website:
+                query = query.filter(User.source_website == source_website)
+            lapsed_loyal_users = query.order_by(CustomerOrderSummary.lifetime_value.desc(), CustomerOrderSummary.user_id)\
+                .offset(skip).limit(limit).all()
 
             insights = []
             for name, count in lapsed_loyal_users:
@@ -158,18 +249,58 @@ class InsightService:
             ]
 
     @classmethod
-    def get_all_insights(cls, db: Session):
-        cache_key = "all_dashboard_insights"
-        cached_insights = cache_instance.get(cache_key)
-        if cached_insights:
-            return cached_insights
+    def _compute_all_insights(cls, db: Session, source_website: str | None = None):
+        # Generators are independent analytical queries: run them in parallel,
+        # each on its own session, and degrade to a partial result when one
+        # fails or overruns its own timeout
+        generators = {
+            "ad_target": cls.get_ad_target_insights,
+            "pricing": cls.get_pricing_signals,
+            "sourcing": cls.get_sourcing_guide,
+            "offers": cls.get_personalized_offers,
+        }
+        runs = {name: _start_generator(name, fn, source_website) for name, fn in generators.items()}
 
         all_insights = []
-        all_insights.extend(cls.get_ad_target_insights(db))
-        all_insights.extend(cls.get_pricing_signals(db))
-        all_insights.extend(cls.get_sourcing_guide(db))
-        all_insights.extend(cls.get_personalized_offers(db))
-        
-        # Cache for 30 minutes
-        cache_instance.set(cache_key, all_insights, ttl_seconds=1800)
-        return all_insights
+        timings = {}
+        failed = []
+        for name, run in runs.items():
+            try:
+                insights, elapsed = run.result(settings.INSIGHT_GENERATOR_TIMEOUT_SECONDS)
+                all_insights.extend(insights)
+                timings[name] = round(elapsed * 1000, 1)
+            except FutureTimeoutError:
+                timings[name] = settings.INSIGHT_GENERATOR_TIMEOUT_SECONDS * 1000
+                failed.append(name)
+            except Exception:
+                logger.exception("Insight generator %s failed", name)
+                failed.append(name)
+
+        return {
+            "insights": all_insights,
+            "generated_at": datetime.now(),
+            "generator_timings_ms": timings,
+            "failed_generators": failed,
+        }
+
+    @classmethod
+    def get_insight_snapshot(cls, db: Session, source_website: str | None = None):
+        # Dropped as soon as an order, product or user write commits (the next
+        # read recomputes it, once for all concurrent readers); otherwise
+        # recomputed in the background once an hour old (date windows move),
+        # with the stale copy served meanwhile. A snapshot missing a generator
+        # is retried after a minute instead.
+        snapshot, age = refresher.get(
+            tenant_key("all_dashboard_insights", source_website),
+            lambda session: cls._compute_all_insights(session, source_website),
+            db,
+            refresh_after=3600,
+            ttl_seconds=6 * 3600,
+            tags=cache_tags.read_tags(("orders", "products", "users"), source_website),
+            incomplete=lambda value: bool(value["failed_generators"]),
+        )
+        return {**snapshot, "data_age_seconds": round(age, 1)}
+
+    @classmethod
+    def get_all_insights(cls, db: Session, source_website: str | None = None):
+        return cls.get_insight_snapshot(db, source_website)["insights"]
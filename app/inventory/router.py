@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from typing import Literal
 from app.database import get_db
-from app.inventory.schemas import InventorySummary
+from app.inventory.schemas import DeadStockPage, InventorySummary, StockAlertPage
 from app.inventory.service import InventoryIntelligenceService
+from app.utils.common import CursorParams
 
 router = APIRouter(
     prefix="/inventory",
@@ -10,12 +12,51 @@ router = APIRouter(
 )
 
 @router.get("/summary", response_model=InventorySummary)
-def get_inventory_intelligence(db: Session = Depends(get_db)):
+def get_inventory_intelligence(
+    source_website: str | None = Query(None),
+    db: Session = Depends(get_db)
+):
     """
     Get AI-driven inventory insights: Stock-out predictions and Dead stock alerts.
     """
-    return InventoryIntelligenceService.get_inventory_summary(db)
+    return InventoryIntelligenceService.get_inventory_summary(db, source_website)
 
-@router.get("/low-stock")
-def get_low_stock_forecast(db: Session = Depends(get_db)):
-    return InventoryIntelligenceService.get_stock_out_forecast(db)
+@router.get("/low-stock", response_model=StockAlertPage)
+def get_low_stock_forecast(
+    action_required: Literal["Order Now", "Monitor"] | None = Query(None),
+    category: str | None = Query(None),
+    sort: Literal["stock_out", "demand", "stock"] = Query("stock_out"),
+    source_website: str | None = Query(None),
+    page: CursorParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Stock-out alerts from the cached forecast snapshot, sorted server-side.
+    Follow `next_cursor` to page; the forecast is not recomputed per page.
+    """
+    try:
+        return InventoryIntelligenceService.get_stock_alert_page(
+            db, source_website, action_required=action_required, category=category,
+            sort=sort, cursor=page.cursor, limit=page.limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@router.get("/dead-stock", response_model=DeadStockPage)
+def get_dead_stock(
+    min_days: int = Query(30, ge=1),
+    category: str | None = Query(None),
+    source_website: str | None = Query(None),
+    page: CursorParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    In-stock products without a sale for `min_days`, longest idle first.
+    """
+    try:
+        return InventoryIntelligenceService.get_dead_stock_page(
+            db, source_website, min_days=min_days, category=category,
+            cursor=page.cursor, limit=page.limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 class StockAlert(BaseModel):
     product_id: int
@@ -8,14 +8,32 @@ class StockAlert(BaseModel):
     current_stock: int
     predicted_stock_out_days: int
     action_required: str # 'Order Now', 'Monitor', 'Excess'
+    predicted_stock_out_date: Optional[date] = None
+    stock_out_days_low: Optional[int] = None # ~80% interval; None = beyond the forecast horizon
+    stock_out_days_high: Optional[int] = None
+    forecast_daily_demand: float = 0.0
+    category: Optional[str] = None
 
 class DeadStockReport(BaseModel):
     product_id: int
     product_name: str
     days_since_last_sale: int
     suggestion: str
+    severity: str = "medium" # 'low' (30+ days), 'medium' (60+), 'high' (90+ or never sold)
+    current_stock: int = 0
+    last_sold_at: Optional[datetime] = None
 
 class InventorySummary(BaseModel):
     low_stock_items: List[StockAlert]
     dead_stock_items: List[DeadStockReport]
     generated_at: datetime
+
+class StockAlertPage(BaseModel):
+    items: List[StockAlert]
+    next_cursor: Optional[str] = None # Pass back as `cursor` for the next page; None on the last page
+    generated_at: datetime
+    data_age_seconds: float = 0.0
+
+class DeadStockPage(BaseModel):
+    items: List[DeadStockReport]
+    next_cursor: Optional[str] = None
@@ -1,84 +1,258 @@
+from bisect import bisect_right
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
-import pandas as pd
+from sqlalchemy import and_, or_
+from datetime import date, datetime, timedelta
+import numpy as np
 from app.products.models import Product
-from app.orders.models import Order, OrderDetail
+from app.inventory.forecast import fit_holt, forecast_stock_out, load_sales_matrix
 from app.inventory.schemas import StockAlert, DeadStockReport
+from app.utils import cache_tags
+from app.utils.cache import tenant_key
+from app.utils.common import decode_cursor, encode_cursor
+from app.utils.refresher import refresher
+
+STOCK_ALERT_SORTS = ("stock_out", "demand", "stock")
+_NO_STOCK_OUT = 10**6 # sort key for alerts without a predicted stock-out date
+
+
+def _optional_int(value):
+    return None if np.isnan(value) else int(value)
+
+
+def _stock_alert_key(alert: StockAlert, sort: str) -> tuple:
+    if sort == "demand":
+        return (-alert.forecast_daily_demand, alert.product_id)
+    if sort == "stock":
+        return (alert.current_stock, alert.product_id)
+    days_low = alert.stock_out_days_low
+    return (_NO_STOCK_OUT if days_low is None else days_low, alert.product_id)
+
+
+def _cursor_key(after) -> tuple:
+    """Validate a decoded ``after`` position against the ``(number, product_id)`` key shape."""
+    if (
+        not isinstance(after, list)
+        or len(after) != 2
+        or isinstance(after[0], bool) or not isinstance(after[0], (int, float))
+        or isinstance(after[1], bool) or not isinstance(after[1], int)
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(after)
+
+
+def _dead_stock_tier(days_idle: int, never_sold: bool) -> tuple[str, str]:
+    if never_sold or days_idle >= 90:
+        return "high", "৯০+ দিন বিক্রি নেই। Clearance Sale বা বান্ডেল অফারে দ্রুত স্টক ছেড়ে দিন, নতুন করে আর সোর্স করবেন না।"
+    if days_idle >= 60:
+        return "medium", "Clearance Sale দিন অথবা সোশ্যাল মিডিয়াতে হাইলাইটস করুন।"
+    return "low", "বিক্রি ধীর হয়ে গেছে। ফেসবুক পোস্টে হাইলাইট করুন বা ছোট ডিসকাউন্ট দিয়ে দেখুন।"
+
 
 class InventoryIntelligenceService:
     @staticmethod
-    def get_stock_out_forecast(db: Session):
-        # Calculate daily sales velocity for the last 14 days
-        fourteen_days_ago = datetime.now() - timedelta(days=14)
-        
-        query = db.query(
-            Product.id,
-            Product.product_name,
-            Product.stock_quantity,
-            func.sum(OrderDetail.quantity).label('total_sales_14d')
-        ).outerjoin(OrderDetail, Product.id == OrderDetail.product_id)\
-         .outerjoin(Order, OrderDetail.order_id == Order.id)\
-         .filter((Order.created_at >= fourteen_days_ago) | (OrderDetail.id == None))\
-         .group_by(Product.id)\
-         .all()
-        
+    def get_stock_out_forecast(
+        db: Session,
+        source_website: str | None = None,
+        alert_days: int = 7,
+        history_days: int = 56,
+    ):
+        # Damped Holt smoothing over a products x days sales matrix, fitted to
+        # every SKU at once; products with no recent sales still get a row
+        product_ids, names, categories, stock, sales = load_sales_matrix(db, history_days, source_website)
+        forecast = forecast_stock_out(stock, fit_holt(sales))
+
+        has_demand = forecast.daily_demand > 0
+        at_risk = has_demand & (forecast.days_low <= alert_days)
+        low_without_demand = ~has_demand & (stock <= 5) # Basic low stock alert even without velocity
+        today = date.today()
+
         forecasts = []
-        for pid, name, stock, sales_14d in query:
-            sales_14d = sales_14d or 0
-            daily_velocity = sales_14d / 14 if sales_14d > 0 else 0
-            
-            if daily_velocity > 0:
-                days_left = int(stock / daily_velocity)
-                if days_left <= 7: # Alert if running out within a week
-                    forecasts.append(StockAlert(
-                        product_id=pid,
-                        product_name=name,
-                        current_stock=stock,
-                        predicted_stock_out_days=days_left,
-                        action_required="Order Now" if days_left <= 3 else "Monitor"
-                    ))
-            elif stock <= 5: # Basic low stock alert even without velocity
+        for i in np.flatnonzero(at_risk | low_without_demand):
+            if not has_demand[i]:
                 forecasts.append(StockAlert(
-                    product_id=pid,
-                    product_name=name,
-                    current_stock=stock,
+                    product_id=int(product_ids[i]),
+                    product_name=names[i],
+                    current_stock=int(stock[i]),
                     predicted_stock_out_days=-1, # Unknown
-                    action_required="Order Now"
+                    action_required="Order Now",
+                    category=categories[i],
                 ))
+                continue
+            days_left = _optional_int(forecast.days[i])
+            days_low = _optional_int(forecast.days_low[i])
+            forecasts.append(StockAlert(
+                product_id=int(product_ids[i]),
+                product_name=names[i],
+                current_stock=int(stock[i]),
+                predicted_stock_out_days=-1 if days_left is None else days_left,
+                action_required="Order Now" if days_low <= 3 else "Monitor",
+                predicted_stock_out_date=None if days_left is None else today + timedelta(days=days_left),
+                stock_out_days_low=days_low,
+                stock_out_days_high=_optional_int(forecast.days_high[i]),
+                forecast_daily_demand=round(float(forecast.daily_demand[i]), 2),
+                category=categories[i],
+            ))
+        forecasts.sort(key=lambda a: _stock_alert_key(a, "stock_out"))
         return forecasts
 
+    @classmethod
+    def _build_stock_alert_snapshot(cls, db: Session, source_website: str | None = None):
+        # Forecast once, pre-sorted for every supported order so a page is a
+        # bisect plus a short scan
+        alerts = cls.get_stock_out_forecast(db, source_website)
+        by_sort = {}
+        for sort in STOCK_ALERT_SORTS:
+            ordered = sorted(alerts, key=lambda a: _stock_alert_key(a, sort))
+            by_sort[sort] = ([_stock_alert_key(a, sort) for a in ordered], ordered)
+        return {"by_sort": by_sort, "generated_at": datetime.now()}
+
+    @classmethod
+    def get_stock_alert_snapshot(cls, db: Session, source_website: str | None = None):
+        """Per-tenant alert snapshot, dropped on order/product writes and refreshed every 15 minutes."""
+        return refresher.get(
+            tenant_key("inventory_stock_alerts", source_website),
+            lambda session: cls._build_stock_alert_snapshot(session, source_website),
+            db,
+            refresh_after=900,
+            ttl_seconds=3600,
+            tags=cache_tags.read_tags(("orders", "products"), source_website),
+        )
+
+    @classmethod
+    def get_stock_alert_page(
+        cls,
+        db: Session,
+        source_website: str | None = None,
+        action_required: str | None = None,
+        category: str | None = None,
+        sort: str = "stock_out",
+        cursor: str | None = None,
+        limit: int = 50,
+    ):
+        snapshot, age = cls.get_stock_alert_snapshot(db, source_website)
+        keys, alerts = snapshot["by_sort"][sort]
+
+        start = 0
+        if cursor:
+            position = decode_cursor(cursor)
+            if position.get("sort") != sort:
+                raise ValueError("Cursor does not match this sort order")
+            # Keyset position: stays valid when the snapshot is refreshed between pages
+            start = bisect_right(keys, _cursor_key(position.get("after")))
+
+        items = []
+        i = start
+        while i < len(alerts) and len(items) < limit:
+            alert = alerts[i]
+            i += 1
+            if action_required and alert.action_required != action_required:
+                continue
+            if category and alert.category != category:
+                continue
+            items.append(alert)
+
+        next_cursor = None
+        if len(items) == limit and i < len(alerts):
+            next_cursor = encode_cursor({"sort": sort, "after": list(keys[i - 1])})
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "generated_at": snapshot["generated_at"],
+            "data_age_seconds": round(age, 1),
+        }
+
     @staticmethod
-    def get_dead_stock_alerts(db: Session):
-        # Find products with 0 sales in the last 30 days but positive stock
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        # Subquery for products sold in last 30 days
-        sold_product_ids = db.query(OrderDetail.product_id)\
-            .join(Order, OrderDetail.order_id == Order.id)\
-            .filter(Order.created_at >= thirty_days_ago)\
-            .distinct().all()
-        sold_ids = [r[0] for r in sold_product_ids]
-        
+    def get_dead_stock_alerts(
+        db: Session,
+        source_website: str | None = None,
+        min_days: int = 30,
+        limit: int = 10,
+        category: str | None = None,
+        after: tuple[datetime | None, int] | None = None,
+    ):
+        # In-stock products with no sale for `min_days`, oldest first; an index
+        # range scan on products.last_sold_at (never-sold products sort first).
+        # `after` is the (last_sold_at, id) keyset position of the previous page.
+        now = datetime.now()
+        cutoff = now - timedelta(days=min_days)
+
         dead_stock = db.query(Product)\
-            .filter(~Product.id.in_(sold_ids))\
+            .filter(or_(Product.last_sold_at.is_(None), Product.last_sold_at < cutoff))\
+            .filter(Product.created_at < cutoff)\
             .filter(Product.stock_quantity > 0)\
-            .limit(10).all()
-            
+            .filter(Product.is_active == True)
+        if source_website:
+            dead_stock = dead_stock.filter(Product.source_website == source_website)
+        if category:
+            dead_stock = dead_stock.filter(Product.category == category)
+        if after is not None:
+            last_sold_at, product_id = after
+            if last_sold_at is None:
+                dead_stock = dead_stock.filter(or_(
+                    Product.last_sold_at.isnot(None),
+                    Product.id > product_id,
+                ))
+            else:
+                dead_stock = dead_stock.filter(or_(
+                    Product.last_sold_at > last_sold_at,
+                    and_(Product.last_sold_at == last_sold_at, Product.id > product_id),
+                ))
+        dead_stock = dead_stock.order_by(Product.last_sold_at.asc().nulls_first(), Product.id)\
+            .limit(limit).all()
+
         reports = []
         for prod in dead_stock:
+            days_idle = (now - (prod.last_sold_at or prod.created_at)).days
+            severity, suggestion = _dead_stock_tier(days_idle, prod.last_sold_at is None)
             reports.append(DeadStockReport(
                 product_id=prod.id,
                 product_name=prod.product_name,
-                days_since_last_sale=30, # Minimal 30 days
-                suggestion="Clearance Sale দিন অথবা সোশ্যাল মিডিয়াতে হাইলাইটস করুন।"
+                days_since_last_sale=days_idle,
+                suggestion=suggestion,
+                severity=severity,
+                current_stock=prod.stock_quantity,
+                last_sold_at=prod.last_sold_at,
             ))
         return reports
 
     @classmethod
-    def get_inventory_summary(cls, db: Session):
+    def get_dead_stock_page(
+        cls,
+        db: Session,
+        source_website: str | None = None,
+        min_days: int = 30,
+        category: str | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ):
+        after = None
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                last_sold_at = position["last_sold_at"]
+                after = (last_sold_at and datetime.fromisoformat(last_sold_at), int(position["id"]))
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError("Invalid cursor") from exc
+
+        items = cls.get_dead_stock_alerts(
+            db, source_website, min_days=min_days, limit=limit, category=category, after=after
+        )
+        next_cursor = None
+        if len(items) == limit:
+            last = items[-1]
+            next_cursor = encode_cursor({
+                "last_sold_at": last.last_sold_at and last.last_sold_at.isoformat(),
+                "id": last.product_id,
+            })
+        return {"items": items, "next_cursor": next_cursor}
+
+    @classmethod
+    def get_inventory_summary(cls, db: Session, source_website: str | None = None, top: int = 20):
+        # Most urgent alerts only; page through the rest via /inventory/low-stock
+        snapshot, _ = cls.get_stock_alert_snapshot(db, source_website)
+        _, alerts = snapshot["by_sort"]["stock_out"]
         return {
-            "low_stock_items": cls.get_stock_out_forecast(db),
-            "dead_stock_items": cls.get_dead_stock_alerts(db),
-            "generated_at": datetime.now()
+            "low_stock_items": alerts[:top],
+            "dead_stock_items": cls.get_dead_stock_alerts(db, source_website),
+            "generated_at": snapshot["generated_at"]
         }
@@ -0,0 +1 @@
+# Shared LLM Client
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """The model call failed and retrying will not help."""
+
+
+class LLMTransientError(LLMError):
+    """Rate limited, overloaded or a server-side hiccup; safe to retry."""
+
+
+class LLMBackend(ABC):
+    """Anything that turns a prompt into text."""
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        ...
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the completion in chunks; backends without streaming send it whole."""
+        yield await self.generate(prompt)
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str):
+        import google.generativeai as genai
+        from google.api_core import exceptions as google_exceptions
+
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self._model = genai.GenerativeModel(model_name)
+        self._transient = (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.InternalServerError,
+        )
+
+    async def generate(self, prompt: str) -> str:
+        try:
+            response = await self._model.generate_content_async(prompt)
+            return response.text
+        except self._transient as exc:
+            raise LLMTransientError(str(exc)) from exc
+        except Exception as exc:
+            raise LLMError(str(exc)) from exc
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        try:
+            response = await self._model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except self._transient as exc:
+            raise LLMTransientError(str(exc)) from exc
+        except Exception as exc:
+            raise LLMError(str(exc)) from exc
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic in-process stand-in for offline load tests.
+
+    Each call waits ``latency_seconds`` (time to first token, jittered by up
+    to ``jitter`` either way), then produces ``output_tokens`` words at
+    ``tokens_per_second``. The answer, jitter and simulated failures come
+    from a seeded generator, so a benchmark run is reproducible.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.5,
+        tokens_per_second: float = 50.0,
+        output_tokens: int = 40,
+        failure_rate: float = 0.0,
+        jitter: float = 0.2,
+        seed: int = 0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def _answer(self, prompt: str) -> list[str]:
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        filler = ["এটি", "একটি", "পরীক্ষামূলক", "উত্তর।"]
+        return [f"[fake:{digest}]"] + [filler[i % len(filler)] for i in range(max(0, self.output_tokens - 1))]
+
+    async def _first_token(self) -> None:
+        spread = self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        await asyncio.sleep(self.latency_seconds * spread)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise LLMTransientError("fake backend: simulated overload")
+
+    async def generate(self, prompt: str) -> str:
+        await self._first_token()
+        words = self._answer(prompt)
+        if self.tokens_per_second:
+            await asyncio.sleep(len(words) / self.tokens_per_second)
+        return " ".join(words)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await self._first_token()
+        words = self._answer(prompt)
+        for i, word in enumerate(words):
+            if i and self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield word if i == len(words) - 1 else word + " "
+
+
+def _gemini_backend() -> LLMBackend:
+    return GeminiBackend(settings.LLM_MODEL)
+
+
+def _fake_backend() -> LLMBackend:
+    return FakeBackend(
+        latency_seconds=settings.LLM_FAKE_LATENCY_SECONDS,
+        tokens_per_second=settings.LLM_FAKE_TOKENS_PER_SECOND,
+        output_tokens=settings.LLM_FAKE_OUTPUT_TOKENS,
+        failure_rate=settings.LLM_FAKE_FAILURE_RATE,
+    )
+
+
+# settings.LLM_PROVIDER -> factory; a new provider only needs an entry here
+PROVIDERS: dict[str, Callable[[], LLMBackend]] = {
+    "gemini": _gemini_backend,
+    "fake": _fake_backend,
+}
+
+
+def build_backend(provider: str | None = None) -> LLMBackend | None:
+    """Backend for ``provider`` (default ``settings.LLM_PROVIDER``); None if it cannot be set up."""
+    provider = provider or settings.LLM_PROVIDER
+    factory = PROVIDERS.get(provider)
+    if factory is None:
+        logger.error("Unknown LLM_PROVIDER %r; AI features are disabled", provider)
+        return None
+    try:
+        return factory()
+    except Exception as exc:
+        logger.warning("LLM provider %r is unavailable: %s", provider, exc)
+        return None
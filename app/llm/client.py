@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import Request
+
+from app.config import settings
+from app.llm.backends import LLMBackend, LLMError, LLMTransientError, build_backend
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(LLMError):
+    """No backend is configured (e.g. missing API key)."""
+
+
+class LLMBusy(LLMError):
+    """Too many requests already waiting for a model slot."""
+
+
+class LLMTimeout(LLMError):
+    """Every attempt ran past its deadline."""
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class LLMClient:
+    """Async gateway to the model shared by advisor, chatbot and sentiment.
+
+    Each call needs a slot from its feature's semaphore and from the global
+    one, so a chatbot burst can't take every slot. Attempts have a timeout,
+    and transient failures are retried with full-jitter exponential backoff.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend | None,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        feature_concurrency: dict[str, int] | None = None,
+        timeout_seconds: float = settings.LLM_TIMEOUT_SECONDS,
+        queue_timeout_seconds: float = settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        max_retries: int = settings.LLM_MAX_RETRIES,
+        retry_base_seconds: float = settings.LLM_RETRY_BASE_SECONDS,
+    ):
+        self.backend = backend
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self._max_concurrency = max_concurrency
+        self._feature_concurrency = dict(
+            settings.LLM_FEATURE_CONCURRENCY if feature_concurrency is None else feature_concurrency
+        )
+        self._global: asyncio.Semaphore | None = None
+        self._features: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def concurrency(self, feature: str) -> int:
+        """How many calls ``feature`` can have in flight; size fan-outs to this."""
+        return min(self._feature_concurrency.get(feature, self._max_concurrency), self._max_concurrency)
+
+    def _semaphores(self, feature: str) -> tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        # Created lazily so they belong to the serving event loop
+        if self._global is None:
+            self._global = asyncio.Semaphore(self._max_concurrency)
+        if feature not in self._features:
+            limit = self._feature_concurrency.get(feature, self._max_concurrency)
+            self._features[feature] = asyncio.Semaphore(limit)
+        return self._features[feature], self._global
+
+    @asynccontextmanager
+    async def _slot(self, feature: str):
+        if self.backend is None:
+            raise LLMUnavailable("LLM backend is not configured")
+
+        feature_slot, global_slot = self._semaphores(feature)
+        try:
+            await asyncio.wait_for(feature_slot.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            raise LLMBusy(f"{feature}: no free model slot")
+        try:
+            try:
+                await asyncio.wait_for(global_slot.acquire(), self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                raise LLMBusy("no free model slot")
+            try:
+                yield
+            finally:
+                global_slot.release()
+        finally:
+            feature_slot.release()
+
+    async def _retry_or_raise(self, feature: str, attempt: int, exc: Exception) -> None:
+        if attempt >= self.max_retries:
+            if isinstance(exc, asyncio.TimeoutError):
+                raise LLMTimeout(f"{feature}: model call timed out") from exc
+            raise exc
+        delay = random.uniform(0, self.retry_base_seconds * 2 ** attempt)
+        logger.warning(
+            "LLM %s attempt %d failed (%s); retrying in %.2fs",
+            feature, attempt + 1, exc or type(exc).__name__, delay,
+        )
+        await asyncio.sleep(delay)
+
+    async def generate(self, feature: str, prompt: str) -> str:
+        async with self._slot(feature):
+            attempt = 0
+            while True:
+                try:
+                    return await asyncio.wait_for(self.backend.generate(prompt), self.timeout_seconds)
+                except (asyncio.TimeoutError, LLMTransientError) as exc:
+                    await self._retry_or_raise(feature, attempt, exc)
+                    attempt += 1
+
+    async def stream(self, feature: str, prompt: str) -> AsyncIterator[str]:
+        """Yield completion chunks as they arrive.
+
+        The timeout applies to the wait for each chunk. A failed attempt is
+        retried only if nothing was yielded yet; after that the caller already
+        has part of an answer, so the error propagates.
+        """
+        async with self._slot(feature):
+            attempt = 0
+            while True:
+                chunks = self.backend.stream(prompt)
+                started = False
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout_seconds)
+                        except StopAsyncIteration:
+                            return
+                        started = True
+                        yield chunk
+                except (asyncio.TimeoutError, LLMTransientError) as exc:
+                    # Once part of the answer is out, a retry would repeat it: give up
+                    await self._retry_or_raise(feature, self.max_retries if started else attempt, exc)
+                    attempt += 1
+                finally:
+                    await chunks.aclose()
+
+
+async def cancel_on_disconnect(request: Request, coro, poll_seconds: float = 0.5):
+    """Await ``coro``, cancelling it (and freeing its model slot) if the client goes away."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            # Let the task unwind so its semaphore slots are released before we return
+            await asyncio.gather(task, return_exceptions=True)
+
+
+llm_client = LLMClient(build_backend())
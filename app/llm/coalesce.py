@@ -0,0 +1,65 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """Single-flight for async model calls.
+
+    Concurrent callers with the same ``(feature, key)`` share one upstream
+    call and all get its result (or its exception). The call runs as its own
+    task, so one caller disconnecting doesn't cancel it for the others; it is
+    cancelled only when every waiter has gone.
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple[str, str], _Flight] = {}
+        self._calls = Counter()
+        self._saved = Counter()
+
+    async def run(self, feature: str, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (feature, key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+            self._calls[feature] += 1
+        else:
+            self._saved[feature] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+                # Let the call unwind so its model slot is free before we return
+                await asyncio.gather(flight.task, return_exceptions=True)
+
+    def _forget(self, flight_key: tuple[str, str], flight: _Flight) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+
+    def stats(self) -> dict:
+        features = sorted(set(self._calls) | set(self._saved))
+        return {
+            "in_flight": len(self._flights),
+            "features": {
+                feature: {
+                    "upstream_calls": self._calls[feature],
+                    "calls_saved": self._saved[feature],
+                }
+                for feature in features
+            },
+        }
+
+
+llm_flights = RequestCoalescer()
@@ -0,0 +1,34 @@
+import json
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(data: dict, event: str | None = None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines.append("data: " + json.dumps(data, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+async def single_chunk(text: str) -> AsyncIterator[str]:
+    """Stream an answer that is already complete (cache or catalog hit)."""
+    yield text
+
+
+def sse_response(chunks: AsyncIterator[str], done: dict | None = None) -> StreamingResponse:
+    """Forward text chunks as ``data: {"delta": ...}`` events, then one ``event: done``.
+
+    Starlette cancels the generator when the client disconnects, which
+    releases the model slot held by ``LLMClient.stream``.
+    """
+
+    async def events():
+        async for chunk in chunks:
+            yield sse_event({"delta": chunk})
+        yield sse_event(done or {}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
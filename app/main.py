@@ -17,6 +17,8 @@ import app.auth.models  # noqa: F401
 import app.users.models  # noqa: F401
 import app.products.models  # noqa: F401
 import app.orders.models  # noqa: F401
+import app.analytics.models  # noqa: F401
+import app.utils.cache_tags  # noqa: F401
 
 app = FastAPI(
     title="E-Commerce Predictor API",
@@ -36,9 +38,9 @@ app.include_router(user_router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(product_router, prefix="/api/v1/products", tags=["Products"])
 app.include_router(order_router, prefix="/api/v1/orders", tags=["Orders"])
 app.include_router(insights_router, prefix="/api/v1/insights", tags=["AI Insights"])
-app.include_router(chatbot_router, prefix="/api/v1/chatbot", tags=["AI Chatbot"])
+app.include_router(chatbot_router, prefix="/api/v1") # router carries its own /chatbot prefix
 app.include_router(inventory_router, prefix="/api/v1/inventory", tags=["Inventory Intelligence"])
-app.include_router(advisor_router, prefix="/api/v1/advisor", tags=["AI Merchant Advisor"])
+app.include_router(advisor_router, prefix="/api/v1") # router carries its own /advisor prefix
 app.include_router(ui_router)
 app.include_router(admin_router, prefix="/api/v1")
 
@@ -1,16 +1,29 @@
+from decimal import Decimal
+
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.analytics import service as analytics
 from app.orders.models import Order, OrderDetail
 from app.orders.schemas import OrderCreate, OrderUpdate, OrderDetailCreate, OrderDetailUpdate
+from app.utils import cache_tags
 
 
 # ── Helper ────────────────────────────────────────────────────────────
 
-def _recalculate_order_total(db: Session, order: Order) -> None:
-    """Recalculate total_amount from the sum of all detail total_prices."""
-    total = sum(float(d.total_price) for d in order.details)
+def _recalculate_order_total(db: Session, order: Order) -> Decimal:
+    """Recalculate total_amount from the sum of all detail total_prices.
+
+    Returns how much total_amount moved, which is what the customer summary
+    must absorb (a manual total override is replaced here, not adjusted).
+    """
+    previous_total = Decimal(order.total_amount or 0)
+    # Sum in SQL: order.details may be a stale collection after a flush
+    total = db.query(func.coalesce(func.sum(OrderDetail.total_price), 0))\
+        .filter(OrderDetail.order_id == order.id).scalar()
     order.total_amount = total
     db.flush()
+    return Decimal(total) - previous_total
 
 
 # ── Order CRUD ────────────────────────────────────────────────────────
@@ -26,7 +39,8 @@ def create_order(db: Session, order_data: OrderCreate) -> Order:
     db.add(order)
     db.flush()  # flush to get order.id
 
-    total_amount = 0.00
+    district = analytics.resolve_district(db, order.user_id)
+    total_amount = Decimal("0.00")
     for detail_data in order_data.details:
         total_price = detail_data.quantity * detail_data.unit_price
         detail = OrderDetail(
@@ -37,9 +51,15 @@ def create_order(db: Session, order_data: OrderCreate) -> Order:
             total_price=total_price,
         )
         db.add(detail)
+        analytics.record_order_line(
+            db, order, detail_data.product_id, detail_data.quantity, total_price,
+            district=district,
+        )
         total_amount += total_price
 
     order.total_amount = total_amount
+    analytics.record_customer_order(db, order, 1, total_amount)
+    cache_tags.bump(db, "orders", source_website=order.source_website)
     db.commit()
     db.refresh(order)
     return order
@@ -69,10 +89,17 @@ def update_order(db: Session, order_id: int, order_data: OrderUpdate) -> Order |
     if not order:
         return None
 
+    previous_total = order.total_amount or 0
     update_fields = order_data.model_dump(exclude_unset=True)
     for field, value in update_fields.items():
         setattr(order, field, value)
 
+    if "total_amount" in update_fields:
+        analytics.record_customer_order(
+            db, order, 0, Decimal(order.total_amount or 0) - Decimal(previous_total)
+        )
+
+    cache_tags.bump(db, "orders", source_website=order.source_website)
     db.commit()
     db.refresh(order)
     return order
@@ -84,6 +111,7 @@ def delete_order(db: Session, order_id: int) -> Order | None:
         return None
 
     order.status = "cancelled"
+    cache_tags.bump(db, "orders", source_website=order.source_website)
     db.commit()
     db.refresh(order)
     return order
@@ -108,8 +136,9 @@ def add_order_detail(
     )
     db.add(detail)
     db.flush()
-
-    _recalculate_order_total(db, order)
+    analytics.record_order_line(db, order, detail.product_id, detail.quantity, total_price)
+    analytics.record_customer_order(db, order, 0, _recalculate_order_total(db, order))
+    cache_tags.bump(db, "orders", source_website=order.source_website)
     db.commit()
     db.refresh(detail)
     return detail
@@ -122,18 +151,30 @@ def update_order_detail(
     if not detail:
         return None
 
+    previous_quantity = detail.quantity
+    previous_total = detail.total_price
+
     update_fields = detail_data.model_dump(exclude_unset=True)
     for field, value in update_fields.items():
         setattr(detail, field, value)
 
     # Recalculate the detail total_price
-    detail.total_price = detail.quantity * float(detail.unit_price)
+    detail.total_price = detail.quantity * Decimal(detail.unit_price)
     db.flush()
 
     # Recalculate the parent order total_amount
     order = db.query(Order).filter(Order.id == detail.order_id).first()
     if order:
-        _recalculate_order_total(db, order)
+        analytics.record_order_line(
+            db,
+            order,
+            detail.product_id,
+            detail.quantity - previous_quantity,
+            detail.total_price - previous_total,
+            order_lines=0,
+        )
+        analytics.record_customer_order(db, order, 0, _recalculate_order_total(db, order))
+        cache_tags.bump(db, "orders", source_website=order.source_website)
 
     db.commit()
     db.refresh(detail)
@@ -152,7 +193,11 @@ def delete_order_detail(db: Session, detail_id: int) -> OrderDetail | None:
     # Recalculate the parent order total_amount
     order = db.query(Order).filter(Order.id == order_id).first()
     if order:
-        _recalculate_order_total(db, order)
+        analytics.record_order_line(
+            db, order, detail.product_id, -detail.quantity, -detail.total_price, order_lines=-1
+        )
+        analytics.record_customer_order(db, order, 0, _recalculate_order_total(db, order))
+        cache_tags.bump(db, "orders", source_website=order.source_website)
 
     db.commit()
     return detail
@@ -1,10 +1,13 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
 
 from app.database import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_last_sold_at", "last_sold_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     product_name = Column(String(255), nullable=False)
@@ -19,6 +22,12 @@ class Product(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Sales counters maintained by order writes (app.analytics.service.record_product_sale)
+    # and re-aligned by the backfill as days roll out of the windows
+    last_sold_at = Column(DateTime, nullable=True)
+    sold_qty_7d = Column(Integer, nullable=False, default=0)
+    sold_qty_30d = Column(Integer, nullable=False, default=0)
+    sold_qty_90d = Column(Integer, nullable=False, default=0)
 
 class ProductReview(Base):
     __tablename__ = "product_reviews"
@@ -29,3 +38,15 @@ class ProductReview(Base):
     review_text = Column(Text)
     sentiment_label = Column(String(20)) # 'positive', 'negative', 'neutral'
     created_at = Column(DateTime, default=func.now())
+
+
+class ProductPriceHistory(Base):
+    __tablename__ = "product_price_history"
+    __table_args__ = (
+        Index("ix_product_price_history_product_recorded", "product_id", "recorded_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    price = Column(Numeric(10, 2), nullable=False)
+    recorded_at = Column(DateTime, default=func.now())
@@ -1,13 +1,19 @@
 from sqlalchemy.orm import Session
 
-from app.products.models import Product
+from app.chatbot.knowledge import product_knowledge
+from app.products.models import Product, ProductPriceHistory
 from app.products.schemas import ProductCreate, ProductUpdate
+from app.utils import cache_tags
 
 
 def create_product(db: Session, product_data: ProductCreate) -> Product:
     product = Product(**product_data.model_dump())
     db.add(product)
+    db.flush()
+    db.add(ProductPriceHistory(product_id=product.id, price=product.price))
+    cache_tags.bump(db, "products", source_website=product.source_website)
     db.commit()
+    product_knowledge.mark_stale()
     db.refresh(product)
     return product
 
@@ -35,9 +41,14 @@ def update_product(
     if product is None:
         return None
     update_data = product_data.model_dump(exclude_unset=True)
+    price_changed = "price" in update_data and update_data["price"] != product.price
     for key, value in update_data.items():
         setattr(product, key, value)
+    if price_changed:
+        db.add(ProductPriceHistory(product_id=product.id, price=product.price))
+    cache_tags.bump(db, "products", source_website=product.source_website)
     db.commit()
+    product_knowledge.mark_stale()
     db.refresh(product)
     return product
 
@@ -47,6 +58,8 @@ def delete_product(db: Session, product_id: int) -> Product | None:
     if product is None:
         return None
     product.is_active = False
+    cache_tags.bump(db, "products", source_website=product.source_website)
     db.commit()
+    product_knowledge.mark_stale()
     db.refresh(product)
     return product
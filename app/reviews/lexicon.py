@@ -0,0 +1,175 @@
+"""Offline Bengali + English sentiment scorer for product reviews.
+
+Each review is tokenized once. Its lexicon hits are laid out as flat
+arrays (weight, review index) and summed per review with ``np.bincount``;
+everything after tokenizing is vectorized over the whole batch. The star
+rating, when present, is blended in as a second signal. Reviews where the
+text has no evidence, or where text and rating disagree, come back with low
+confidence so the caller can ask the model instead.
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.utils.semantic_cache import normalize_text
+
+# Polarity weights: 2 strong, 1 mild. Bengali, romanized Bengali ("Banglish") and English.
+WORDS = {
+    # Bengali positive
+    "ভালো": 1, "ভাল": 1, "ভালোই": 1, "সুন্দর": 1.5, "চমৎকার": 2, "দারুণ": 2, "দারুন": 2,
+    "অসাধারণ": 2, "অসাধারন": 2, "সেরা": 2, "খুশি": 1.5, "সন্তুষ্ট": 1.5, "পছন্দ": 1,
+    "পছন্দের": 1, "আরামদায়ক": 1.5, "মানসম্মত": 1.5, "নিখুঁত": 2, "পারফেক্ট": 2, "মুগ্ধ": 2,
+    "ধন্যবাদ": 0.5, "দ্রুত": 0.5, "টেকসই": 1, "বিশ্বস্ত": 1, "চমৎকারভাবে": 2, "ফাটাফাটি": 2,
+    "জোস": 2, "উপকারী": 1, "সুপার": 1.5, "ঠিকমতো": 0.5, "সময়মতো": 0.5,
+    # Bengali negative
+    "খারাপ": -1.5, "বাজে": -2, "জঘন্য": -2, "ফালতু": -2, "নষ্ট": -1.5, "ছেঁড়া": -1.5,
+    "ছেড়া": -1.5, "ফাটা": -1.5, "ভাঙা": -1.5, "দেরি": -1, "দেরিতে": -1, "নিম্নমানের": -2,
+    "ভুয়া": -2, "নকল": -1.5, "প্রতারণা": -2, "প্রতারক": -2, "অসন্তুষ্ট": -1.5, "হতাশ": -1.5,
+    "ভুল": -1, "ঠকেছি": -2, "ঠকলাম": -2, "ময়লা": -1, "দাগ": -1, "বিরক্ত": -1.5,
+    "অভিযোগ": -1, "পাইনি": -1.5, "রিফান্ড": -0.5, "ফেরত": -0.5, "কম": -0.5,
+    # Banglish
+    "valo": 1, "bhalo": 1, "darun": 2, "shundor": 1.5, "sundor": 1.5, "fatafati": 2, "joss": 2,
+    "kharap": -1.5, "baje": -2, "faltu": -2, "nosto": -1.5,
+    # English positive
+    "good": 1, "nice": 1, "great": 1.5, "excellent": 2, "awesome": 2, "amazing": 2,
+    "perfect": 2, "love": 1.5, "loved": 1.5, "best": 1.5, "happy": 1.5, "satisfied": 1.5,
+    "comfortable": 1.5, "beautiful": 1.5, "recommend": 1, "recommended": 1, "fast": 0.5,
+    "quick": 0.5, "thanks": 0.5, "premium": 1, "soft": 0.5, "worth": 1, "genuine": 1,
+    "fantastic": 2, "superb": 2, "quality": 0.5,
+    # English negative
+    "bad": -1.5, "poor": -1.5, "worst": -2, "terrible": -2, "awful": -2, "horrible": -2,
+    "disappointed": -1.5, "disappointing": -1.5, "fake": -2, "damaged": -1.5, "broken": -1.5,
+    "torn": -1.5, "late": -1, "delay": -1, "delayed": -1, "wrong": -1, "cheap": -0.5,
+    "fraud": -2, "refund": -0.5, "return": -0.5, "returned": -1, "waste": -2, "useless": -2,
+    "faded": -1.5, "defective": -2, "rude": -1.5,
+    # Complaint nouns: "no issues", "কোনো সমস্যা নেই" are praise (see NOUNS)
+    "issue": -1, "issues": -1, "problem": -1, "problems": -1, "complaint": -1, "complaints": -1,
+    "defect": -1.5, "defects": -1.5, "flaw": -1, "flaws": -1, "damage": -1.5, "সমস্যা": -1, "ত্রুটি": -1.5,
+}
+# Negated, these flip to full-strength praise instead of damped ("no complaints" = good)
+NOUNS = {
+    "issue", "issues", "problem", "problems", "complaint", "complaints", "defect", "defects", "flaw", "flaws",
+    "damage", "delay", "সমস্যা", "ত্রুটি", "অভিযোগ", "দেরি",
+}
+# Multi-word expressions are matched before single words and consume their tokens
+PHRASES = {
+    ("waste", "of", "money"): -2, ("value", "for", "money"): 2, ("not", "worth"): -1.5,
+    ("money", "back"): -1, ("টাকা", "নষ্ট"): -2, ("টাকা", "উসুল"): 2, ("রং", "উঠে"): -2,
+    ("রং", "চলে"): -2, ("সাইজ", "ছোট"): -1, ("সাইজ", "বড়"): -1, ("size", "issue"): -1,
+    ("too", "small"): -1, ("too", "big"): -1,
+}
+# Words that mark a review as deliberately middling
+NEUTRAL = {"মোটামুটি", "ঠিকঠাক", "চলে", "সাধারণ", "চলবে", "ok", "okay", "average", "fine", "decent", "motamuti", "cholbe"}
+NEGATORS_BEFORE = {"not", "no", "never", "hardly"}
+NEGATORS_AFTER = {"না", "নয়", "নাই", "নেই", "নি", "na", "noy", "nai"}
+INTENSIFIERS = {"very", "really", "so", "extremely", "highly", "super", "খুব", "খুবই", "অনেক", "একদম", "অত্যন্ত", "বেশ", "khub", "onek"}
+NEGATION_DAMPING = 0.5 # "not bad" is milder praise than "good"
+INTENSIFIER_BOOST = 1.5
+
+RATING_WEIGHT = 1.0 # the star rating counts as much as the text
+NEUTRAL_BAND = 0.2 # |score| below this is neutral
+
+_PHRASE_LENGTHS = sorted({len(p) for p in PHRASES}, reverse=True)
+_CONTRACTION = re.compile(r"n['’]t\b", re.IGNORECASE)
+_CLAUSE_BREAK = re.compile(r"[.,;:!?।॥\n]+")
+# Token standing in for clause punctuation: a letter (so normalize_text keeps
+# it) that real review text doesn't use
+CLAUSE = "ǁ"
+
+
+@dataclass
+class LexiconScores:
+    labels: np.ndarray # 'positive' / 'negative' / 'neutral'
+    score: np.ndarray # combined polarity in [-1, 1]
+    confidence: np.ndarray # 0..1; low means "ask the model"
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Normalized words, with ``CLAUSE`` where sentence or clause punctuation was."""
+    if not text:
+        return []
+    text = _CLAUSE_BREAK.sub(f" {CLAUSE} ", _CONTRACTION.sub(" not", text))
+    return normalize_text(text).split()
+
+
+def _hits(tokens: list[str]):
+    """Yield ``(weight, is_neutral_marker)`` for every lexicon hit in one review."""
+    i, n = 0, len(tokens)
+    while i < n:
+        if tokens[i] == CLAUSE:
+            i += 1
+            continue
+        weight, width = None, 1
+        for length in _PHRASE_LENGTHS:
+            phrase = tuple(tokens[i:i + length])
+            if phrase in PHRASES:
+                weight, width = PHRASES[phrase], length
+                break
+        if weight is None:
+            token = tokens[i]
+            if token in NEUTRAL:
+                yield 0.0, True
+            weight = WORDS.get(token)
+        if weight:
+            if i and tokens[i - 1] in INTENSIFIERS:
+                weight *= INTENSIFIER_BOOST
+            # Negation scope ends at clause punctuation: "no issues. great fit"
+            before = tokens[max(0, i - 3):i]
+            if CLAUSE in before:
+                before = before[len(before) - before[::-1].index(CLAUSE):]
+            negated = any(t in NEGATORS_BEFORE for t in before)
+            # Bengali negates after the word: "ভালো না", "ভালো হয় নি"
+            after = tokens[i + width:i + width + 2]
+            if CLAUSE in after:
+                after = after[:after.index(CLAUSE)]
+            negated ^= any(t in NEGATORS_AFTER for t in after)
+            if negated:
+                weight *= -1 if width == 1 and tokens[i] in NOUNS else -NEGATION_DAMPING
+            yield weight, False
+        i += width
+
+
+def score_reviews(texts: list[str | None], ratings: list[int | None] | None = None) -> LexiconScores:
+    """Label a batch of reviews; ``ratings`` (1-5, or None) is optional."""
+    count = len(texts)
+    weights, owners, neutral_owners = [], [], []
+    for index, text in enumerate(texts):
+        for weight, is_neutral in _hits(tokenize(text)):
+            if is_neutral:
+                neutral_owners.append(index)
+            else:
+                weights.append(weight)
+                owners.append(index)
+
+    owners = np.asarray(owners, dtype=np.int64)
+    text_sum = np.bincount(owners, weights=np.asarray(weights, dtype=float), minlength=count)
+    text_hits = np.bincount(owners, minlength=count)
+    neutral_hits = np.bincount(np.asarray(neutral_owners, dtype=np.int64), minlength=count)
+    text_score = np.tanh(text_sum / 2)
+    has_text = (text_hits + neutral_hits) > 0
+
+    rating = np.array(
+        [np.nan if r is None else r for r in (ratings if ratings is not None else [None] * count)], dtype=float
+    )
+    has_rating = np.isfinite(rating)
+    rating_score = np.where(has_rating, (np.nan_to_num(rating, nan=3.0) - 3) / 2, 0.0)
+
+    both = has_text & has_rating
+    score = np.where(
+        both,
+        (text_score + RATING_WEIGHT * rating_score) / (1 + RATING_WEIGHT),
+        np.where(has_text, text_score, rating_score),
+    )
+
+    labels = np.where(score >= NEUTRAL_BAND, "positive", np.where(score <= -NEUTRAL_BAND, "negative", "neutral"))
+
+    # Confidence: how far past the neutral band the score is, with a floor for
+    # deliberate neutrals, and discounted when text and stars point opposite ways.
+    confidence = np.clip(np.abs(score) / (2 * NEUTRAL_BAND), 0, 1)
+    deliberate_neutral = (labels == "neutral") & ((neutral_hits > 0) | (rating == 3))
+    confidence = np.where(deliberate_neutral, 0.6, confidence)
+    conflict = both & (np.abs(text_score) >= 0.3) & (np.abs(rating_score) >= 0.5) & (np.sign(text_score) != np.sign(rating_score))
+    confidence = np.where(conflict, confidence * 0.3, confidence)
+    confidence = np.where(has_text | has_rating, confidence, 0.0)
+    return LexiconScores(labels=labels, score=score, confidence=confidence)
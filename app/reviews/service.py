@@ -1,33 +1,230 @@
-import google.generativeai as genai
-import os
+import asyncio
+import logging
+import re
+
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.llm.client import LLMBusy, LLMError, LLMTimeout, llm_client
+from app.llm.coalesce import llm_flights
 from app.products.models import ProductReview
+from app.reviews.lexicon import score_reviews
+from app.utils.cache import cached
+
+logger = logging.getLogger(__name__)
+
+LABELS = ("positive", "negative", "neutral")
+MAX_REVIEW_CHARS = 500 # longer reviews are cut so one essay can't blow up a batch
+_LABEL_LINE = re.compile(r"(\d+)\s*[:.)\-]\s*(positive|negative|neutral)", re.IGNORECASE)
+
+
+def _clip(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= MAX_REVIEW_CHARS else text[:MAX_REVIEW_CHARS] + "…"
+
+
+def _listing(reviews) -> str:
+    return "\n".join(f"- [{r.sentiment_label or 'unlabeled'}] {_clip(r.review_text)}" for r in reviews)
+
+
+async def _fan_out(feature: str, calls, return_exceptions: bool = False) -> list:
+    """``asyncio.gather`` over coroutines, at most the feature's model concurrency at a time.
+
+    Coroutines wait here rather than in the client's slot queue, so a long
+    map step never runs into ``LLM_QUEUE_TIMEOUT_SECONDS`` on its own calls.
+    """
+    gate = asyncio.Semaphore(llm_client.concurrency(feature))
+
+    async def gated(call):
+        async with gate:
+            return await call
+
+    return await asyncio.gather(*[gated(call) for call in calls], return_exceptions=return_exceptions)
+
+
+def _in_session(work, *args):
+    """``work(db, *args)`` on its own short-lived session.
+
+    The pipeline awaits the model between reads and writes, so it never keeps
+    a pooled connection (or the caller's request session) across those awaits.
+    """
+    db = SessionLocal()
+    try:
+        return work(db, *args)
+    finally:
+        db.close()
+
+
+def parse_labels(text: str, count: int) -> dict[int, str]:
+    """``{index: label}`` from "3: negative" style lines; out-of-range indexes are dropped."""
+    labels = {}
+    for number, label in _LABEL_LINE.findall(text):
+        index = int(number) - 1
+        if 0 <= index < count:
+            labels[index] = label.lower()
+    return labels
+
 
 class SentimentService:
     @staticmethod
-    def analyze_reviews(db: Session, product_id: int):
-        reviews = db.query(ProductReview).filter(ProductReview.product_id == product_id).all()
-        if not reviews:
-            return "এই পণ্যের কোনো রিভিউ পাওয়া যায়নি।"
-            
-        combined_text = " ".join([r.review_text for r in reviews])
-        
-        # Use Gemini for sentiment summarization
+    def _unlabeled_reviews(db: Session, product_id: int):
+        return db.query(ProductReview.id, ProductReview.rating, ProductReview.review_text)\
+            .filter(ProductReview.product_id == product_id, ProductReview.sentiment_label.is_(None))\
+            .order_by(ProductReview.id).all()
+
+    @staticmethod
+    def _save_labels(db: Session, labels: dict[int, str]):
+        if not labels:
+            return
+        db.bulk_update_mappings(
+            ProductReview, [{"id": review_id, "sentiment_label": label} for review_id, label in labels.items()]
+        )
+        db.commit()
+
+    @staticmethod
+    async def _label_batch(batch) -> dict[int, str]:
+        numbered = "\n".join(f"{i + 1}. {_clip(r.review_text)}" for i, r in enumerate(batch))
+        prompt = f"""
+        Classify the sentiment of each customer review below (they may be in Bengali or English).
+        Answer with one line per review in the form "<number>: <label>", where label is positive, negative or neutral.
+
+        {numbered}
+        """
+        reply = await llm_client.generate("sentiment", prompt)
+        return {batch[i].id: label for i, label in parse_labels(reply, len(batch)).items()}
+
+    @staticmethod
+    async def label_reviews(product_id: int) -> int:
+        """Label the product's unlabeled reviews and persist them; returns how many were labeled.
+
+        The offline lexicon (text + star rating) labels everything it is
+        confident about. Only the remaining reviews with text go to the model,
+        in batches of ``SENTIMENT_LABEL_BATCH_SIZE``; a review the model skips
+        stays unlabeled and is retried next time. Without a model the lexicon's
+        best guess is kept. Failed batches are logged; if every batch failed the
+        error is raised after the lexicon's labels are saved. Reads and writes
+        each use a short-lived session; none is held while the model runs.
+        """
+        pending = await run_in_threadpool(_in_session, SentimentService._unlabeled_reviews, product_id)
+        if not pending:
+            return 0
+        scores = score_reviews([r.review_text for r in pending], [r.rating for r in pending])
+        labels = {}
+        to_classify = []
+        for review, label, confidence in zip(pending, scores.labels, scores.confidence):
+            has_text = bool(review.review_text and review.review_text.strip())
+            if confidence >= settings.SENTIMENT_LEXICON_MIN_CONFIDENCE or not llm_client.available:
+                if has_text or review.rating is not None:
+                    labels[review.id] = str(label)
+            elif has_text:
+                to_classify.append(review)
+
+        size = settings.SENTIMENT_LABEL_BATCH_SIZE
+        batches = [to_classify[i:i + size] for i in range(0, len(to_classify), size)]
+        results = await _fan_out(
+            "sentiment", [SentimentService._label_batch(batch) for batch in batches], return_exceptions=True
+        )
+        failures = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, LLMError):
+                    raise result
+                failures.append((batch, result)) # keep what the other batches produced
+                continue
+            labels.update(result)
+
+        await run_in_threadpool(_in_session, SentimentService._save_labels, labels)
+        if failures:
+            logger.warning(
+                "Product %s: %d of %d sentiment batches failed (%s); %d reviews stay unlabeled",
+                product_id, len(failures), len(batches), failures[0][1], sum(len(batch) for batch, _ in failures),
+            )
+            if len(failures) == len(batches):
+                raise failures[0][1]
+        return len(labels)
+
+    @staticmethod
+    def _review_version(db: Session, product_id: int):
+        """Count and newest id per label: changes only when reviews are added or labeled."""
+        rows = db.query(ProductReview.sentiment_label, func.count(ProductReview.id), func.max(ProductReview.id))\
+            .filter(ProductReview.product_id == product_id)\
+            .group_by(ProductReview.sentiment_label).all()
+        return tuple(sorted((label or "", count, newest) for label, count, newest in rows))
+
+    @staticmethod
+    def _chunks(db: Session, product_id: int):
+        reviews = db.query(ProductReview.id, ProductReview.review_text, ProductReview.sentiment_label)\
+            .filter(ProductReview.product_id == product_id, ProductReview.review_text.isnot(None))\
+            .order_by(ProductReview.id).all()
+        size = settings.SENTIMENT_SUMMARY_CHUNK_SIZE
+        return [reviews[i:i + size] for i in range(0, len(reviews), size)]
+
+    @staticmethod
+    @cached(
+        "review_chunk_notes",
+        ttl_seconds=7 * 86400,
+        key=lambda product_id, chunk: (product_id, chunk[0].id, chunk[-1].id, len(chunk)),
+    )
+    async def _chunk_notes(product_id: int, chunk) -> str:
+        """Map step: short praise/complaint notes for one chunk of reviews.
+
+        Reviews only get appended, so every chunk but the last keeps its
+        (first id, last id, size) key and its cached notes across new reviews.
+        """
+        prompt = f"""
+        নিচের কাস্টমার রিভিউগুলো থেকে প্রধান প্রশংসা ও অভিযোগগুলো সংক্ষেপে (সর্বোচ্চ ৫টি পয়েন্ট) বাংলায় লেখো।
+        {_listing(chunk)}
+        """
+        return await llm_client.generate("sentiment", prompt)
+
+    @staticmethod
+    async def _summarize(product_id: int) -> str:
+        version = await run_in_threadpool(_in_session, SentimentService._review_version, product_id)
+        if not version:
+            return "এই পণ্যের কোনো রিভিউ পাওয়া যায়নি।"
+        return await SentimentService._reduce(product_id, version)
+
+    @staticmethod
+    @cached("review_summary", ttl_seconds=7 * 86400)
+    async def _reduce(product_id: int, version: tuple) -> str:
+        # Keyed by the review version: the summary only goes stale when reviews arrive (or get labeled)
+        chunks = await run_in_threadpool(_in_session, SentimentService._chunks, product_id)
+        if len(chunks) > 1:
+            notes = await _fan_out("sentiment", [SentimentService._chunk_notes(product_id, chunk) for chunk in chunks])
+        else:
+            notes = [_listing(chunk) for chunk in chunks] # small enough to reduce directly
+        counts = {label: count for label, count, _ in version if label}
+        distribution = ", ".join(f"{label}: {counts.get(label, 0)}" for label in LABELS)
+
+        prompt = f"""
+        তুমি একজন কাস্টমার ফিডব্যাক এনালিস্ট। নিচের রিভিউ বিশ্লেষণগুলো থেকে ব্যবসায়ীকে বাংলায় একটি সামারি দাও।
+        রিভিউ সেন্টিমেন্ট গণনা: {distribution}
+        রিভিউ নোটসমূহ:
+        {chr(10).join(notes)}
+
+        আউটপুট ফরম্যাট:
+        ১. সামগ্রিক সেন্টিমেন্ট (Positive/Negative/Neutral)
+        ২. কাস্টমারদের প্রধান অভিযোগ বা প্রশংসা
+        ৩. ব্যবসায়ীর জন্য প্রয়োজনীয় পদক্ষেপ।
+        """
+        return await llm_client.generate("sentiment", prompt)
+
+    @staticmethod
+    async def _analyze(product_id: int) -> str:
+        await SentimentService.label_reviews(product_id)
+        return await SentimentService._summarize(product_id)
+
+    @staticmethod
+    async def analyze_reviews(product_id: int):
+        # Sentiment labeling and map-reduce summary via the shared LLM client.
+        # The shared flight opens its own sessions rather than borrowing the first caller's.
         try:
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            prompt = f"""
-            তুমি একজন কাস্টমার ফিডব্যাক এনালিস্ট। নিচের রিভিউগুলো বিশ্লেষণ করে ব্যবসায়ীকে বাংলায় একটি সামারি দাও।
-            রিভিউসমূহ: {combined_text}
-            
-            আউটপুট ফরম্যাট:
-            ১. সামগ্রিক সেন্টিমেন্ট (Positive/Negative/Neutral)
-            ২. কাস্টমারদের প্রধান অভিযোগ বা প্রশংসা
-            ৩. ব্যবসায়ীর জন্য প্রয়োজনীয় পদক্ষেপ।
-            """
-            
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
+            return await llm_flights.run(
+                "sentiment", str(product_id), lambda: SentimentService._analyze(product_id)
+            )
+        except (LLMBusy, LLMTimeout):
+            return "সেন্টিমেন্ট বিশ্লেষণ এখন ব্যস্ত। কিছুক্ষণ পর আবার চেষ্টা করুন।"
+        except LLMError as e:
             return f"সেন্টিমেন্ট বিশ্লেষণে ত্রুটি: {str(e)}"
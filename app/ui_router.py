@@ -1,50 +1,57 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, desc
+from sqlalchemy.orm import Session
 from app.database import get_db
 from app.insights.service import InsightService
 from app.inventory.service import InventoryIntelligenceService
-from sqlalchemy import func
-from app.orders.models import Order, OrderDetail
-from app.users.models import User, UserAddress
+from sqlalchemy import desc, func
+from app.analytics.models import DailySalesRollup
+from app.orders.models import Order
+from app.users.models import User
 from app.products.models import Product
 
 router = APIRouter(tags=["UI"])
 templates = Jinja2Templates(directory="templates")
 
 @router.get("/")
-async def dashboard(request: Request, db: Session = Depends(get_db)):
-    # Fetch data for the dashboard
-    insights = InsightService.get_all_insights(db)
-    inventory = InventoryIntelligenceService.get_inventory_summary(db)
+def dashboard(
+    request: Request, source_website: str | None = None, db: Session = Depends(get_db)
+):
+    # Fetch data for the dashboard, optionally scoped to one tenant
+    insight_snapshot = InsightService.get_insight_snapshot(db, source_website)
+    inventory = InventoryIntelligenceService.get_inventory_summary(db, source_website)
     
     # Simple stats
-    total_revenue = db.query(func.sum(Order.total_amount)).scalar() or 0
-    total_orders = db.query(Order).count()
+    orders = db.query(func.count(Order.id), func.sum(Order.total_amount))
+    rollup = db.query(DailySalesRollup)
+    if source_website:
+        orders = orders.filter(Order.source_website == source_website)
+        rollup = rollup.filter(DailySalesRollup.source_website == source_website)
+    total_orders, total_revenue = orders.one()
+    total_revenue = total_revenue or 0
     
-    # Regional Sales Data for Chart
-    region_data = db.query(
-        UserAddress.district,
-        func.count(Order.id).label('order_count')
-    ).join(User, UserAddress.user_id == User.id)\
-     .join(Order, User.id == Order.user_id)\
-     .group_by(UserAddress.district)\
-     .order_by(desc('order_count'))\
+    # Regional Sales Data for Chart (units sold per district)
+    region_data = rollup.with_entities(
+        DailySalesRollup.district,
+        func.sum(DailySalesRollup.quantity).label('qty_sold')
+    ).group_by(DailySalesRollup.district)\
+     .order_by(desc('qty_sold'))\
      .limit(5).all()
     
     # Top Products Data for Chart
-    top_products = db.query(
+    top_products = rollup.with_entities(
         Product.product_name,
-        func.sum(OrderDetail.quantity).label('qty_sold')
-    ).join(OrderDetail, Product.id == OrderDetail.product_id)\
-     .group_by(Product.id)\
+        func.sum(DailySalesRollup.quantity).label('qty_sold')
+    ).join(Product, Product.id == DailySalesRollup.product_id)\
+     .group_by(Product.id, Product.product_name)\
      .order_by(desc('qty_sold'))\
      .limit(5).all()
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
         "title": "মার্চেন্ট ড্যাশবোর্ড",
-        "insights": insights,
+        "insights": insight_snapshot["insights"],
+        "insights_age_minutes": int(insight_snapshot["data_age_seconds"] // 60),
         "inventory": inventory,
         "stats": {
             "total_revenue": total_revenue,
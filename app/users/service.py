@@ -7,6 +7,15 @@ from app.users.schemas import (
     UserCreate,
     UserUpdate,
 )
+from app.utils import cache_tags
+
+
+# ── Helper ────────────────────────────────────────────────────────────
+
+def _bump_for_user(db: Session, user_id: int) -> None:
+    """Address changes move users between districts; invalidate their tenant's caches."""
+    user = db.get(User, user_id)
+    cache_tags.bump(db, "users", source_website=user.source_website if user else None)
 
 
 # ── User CRUD ────────────────────────────────────────────────────────
@@ -14,6 +23,7 @@ from app.users.schemas import (
 def create_user(db: Session, user_data: UserCreate) -> User:
     user = User(**user_data.model_dump())
     db.add(user)
+    cache_tags.bump(db, "users", source_website=user.source_website)
     db.commit()
     db.refresh(user)
     return user
@@ -42,6 +52,7 @@ def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User | None
     update_data = user_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(user, key, value)
+    cache_tags.bump(db, "users", source_website=user.source_website)
     db.commit()
     db.refresh(user)
     return user
@@ -52,6 +63,7 @@ def delete_user(db: Session, user_id: int) -> User | None:
     if user is None:
         return None
     user.is_active = False
+    cache_tags.bump(db, "users", source_website=user.source_website)
     db.commit()
     db.refresh(user)
     return user
@@ -64,6 +76,7 @@ def create_user_address(
 ) -> UserAddress:
     address = UserAddress(user_id=user_id, **address_data.model_dump())
     db.add(address)
+    _bump_for_user(db, user_id)
     db.commit()
     db.refresh(address)
     return address
@@ -82,6 +95,7 @@ def update_user_address(
     update_data = address_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(address, key, value)
+    _bump_for_user(db, address.user_id)
     db.commit()
     db.refresh(address)
     return address
@@ -92,5 +106,6 @@ def delete_user_address(db: Session, address_id: int) -> UserAddress | None:
     if address is None:
         return None
     db.delete(address)
+    _bump_for_user(db, address.user_id)
     db.commit()
     return address
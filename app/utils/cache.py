@@ -1,25 +1,323 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+import random
+import sys
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
 
-class SimpleCache:
-    def __init__(self):
-        self._cache = {}
-
-    def get(self, key: str):
-        item = self._cache.get(key)
-        if item:
-            expiry, value = item
-            if time.time() < expiry:
-                return value
-            else:
-                del self._cache[key]
-        return None
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.llm.coalesce import RequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+
+def approximate_size(value, _depth: int = 0) -> int:
+    """Rough deep size in bytes; long containers are sampled and extrapolated."""
+    size = sys.getsizeof(value)
+    if _depth >= 4 or isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        items = list(value.items())
+        sample = items[:64]
+        if sample:
+            per_item = sum(approximate_size(k, _depth + 1) + approximate_size(v, _depth + 1) for k, v in sample)
+            size += per_item * len(items) // len(sample)
+        return size
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+        sample = items[:64]
+        if sample:
+            size += sum(approximate_size(v, _depth + 1) for v in sample) * len(items) // len(sample)
+        return size
+    if hasattr(value, "__dict__"):
+        size += approximate_size(vars(value), _depth + 1)
+    return size
+
+
+class LRUCache:
+    """Thread-safe in-process cache bounded by entry count and approximate bytes.
+
+    Reads refresh an entry's recency; inserts evict least recently used
+    entries until both limits hold. Expired entries are dropped when read and
+    by a daemon sweeper thread, so keys that are never read again don't pin
+    memory until their TTL is long past.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.CACHE_MAX_ENTRIES,
+        max_bytes: int = settings.CACHE_MAX_BYTES,
+        sweep_interval_seconds: float = settings.CACHE_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache: OrderedDict[str, tuple[float, object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = self._misses = self._evictions = self._expirations = self._rejected = 0
+        self._stop = threading.Event()
+        if sweep_interval_seconds:
+            threading.Thread(
+                target=self._sweep_loop, args=(sweep_interval_seconds,), name="cache-sweeper", daemon=True
+            ).start()
+
+    def _drop(self, key: str) -> None:
+        _, _, size = self._cache.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                self._misses += 1
+                return default
+            expiry, value, _ = item
+            if time.time() >= expiry:
+                self._drop(key)
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._cache.move_to_end(key)
+            self._hits += 1
+            return value
 
     def set(self, key: str, value, ttl_seconds: int = 3600):
+        size = approximate_size(key) + approximate_size(value)
         expiry = time.time() + ttl_seconds
-        self._cache[key] = (expiry, value)
+        with self._lock:
+            if key in self._cache:
+                self._drop(key)
+            if size > self.max_bytes:
+                self._rejected += 1 # would flush everything else and still not fit
+                return
+            self._cache[key] = (expiry, value, size)
+            self._bytes += size
+            while len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._cache)))
+                self._evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._cache:
+                self._drop(key)
 
     def clear(self):
-        self._cache = {}
+        with self._lock:
+            self._cache = OrderedDict()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """Drop every expired entry; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expiry, _, _) in self._cache.items() if expiry <= now]
+            for key in expired:
+                self._drop(key)
+            self._expirations += len(expired)
+        return len(expired)
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.sweep()
+
+    def close(self):
+        """Stop the sweeper thread."""
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "approx_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "rejected": self._rejected,
+            }
+
+def tenant_key(key: str, source_website: str | None = None) -> str:
+    """Namespace a cache key per tenant (source_website); global when unscoped."""
+    return f"{key}:{source_website}" if source_website else key
+
+def build_cache(backend: str | None = None):
+    """Cache for ``backend`` (default ``settings.CACHE_BACKEND``).
+
+    'memory' is a per-worker ``LRUCache``; 'sqlite' and 'redis' put a shared
+    store behind it (see ``app.utils.shared_cache``). A shared store that
+    can't be reached at startup falls back to the per-worker cache.
+    """
+    backend = backend or settings.CACHE_BACKEND
+    if backend == "memory":
+        return LRUCache()
+    from app.utils.shared_cache import SHARED_STORES, TieredCache
+
+    factory = SHARED_STORES.get(backend)
+    if factory is None:
+        logger.error("Unknown CACHE_BACKEND %r; using the in-process cache", backend)
+        return LRUCache()
+    try:
+        store = factory(settings.CACHE_URL)
+    except Exception as exc:
+        logger.warning("Shared cache %r is unavailable, using the in-process cache: %s", backend, exc)
+        return LRUCache()
+    return TieredCache(store)
 
 # Global cache instance
-cache_instance = SimpleCache()
+cache_instance = build_cache()
+
+
+# ── @cached ───────────────────────────────────────────────────────────
+
+MISSING = object() # "nothing cached", as opposed to a cached None, [] or ""
+
+
+def hashed_key(namespace: str, *parts) -> str:
+    """``namespace:<32 hex digits>``; a 4 KB question makes a key as short as a one-word one."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def jittered_ttl(ttl_seconds: float, jitter: float) -> float:
+    """Shorten ``ttl_seconds`` by up to ``jitter`` (a fraction) so entries written together expire apart."""
+    return ttl_seconds * (1 - random.random() * jitter) if jitter else ttl_seconds
+
+
+class _ThreadFlights:
+    """Single-flight for sync callers: threads asking for the same key share one computation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, Future] = {}
+
+    def run(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._flights.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._flights[key] = Future()
+        if not is_leader:
+            return future.result()
+        try:
+            future.set_result(compute())
+        except BaseException as exc:
+            future.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._flights[key]
+        return future.result()
+
+
+_thread_flights = _ThreadFlights()
+_task_flights = RequestCoalescer()
+
+
+async def _cache_io(operation: Callable, *args):
+    # The in-process cache answers in microseconds; a shared one may block on its store
+    if isinstance(cache_instance, LRUCache):
+        return operation(*args)
+    return await run_in_threadpool(operation, *args)
+
+
+def cached(
+    namespace: str,
+    ttl_seconds: float,
+    key: Callable[..., tuple] | None = None,
+    jitter: float = 0.1,
+    cache_if: Callable[[Any], bool] | None = None,
+    flights: RequestCoalescer | None = None,
+):
+    """Cache a function's (or coroutine's) result in ``cache_instance``.
+
+    The key is ``namespace`` plus a hash of ``key(*args, **kwargs)`` (by
+    default every argument except ``db``), so long user text never ends up
+    in a key. Any result is cached, empty or None included, unless
+    ``cache_if`` rejects it. Concurrent misses for one key run the function
+    once: threads wait for the first caller, coroutines share one task
+    (through ``flights``, e.g. ``llm_flights`` to count it with the model
+    calls). TTLs are shortened by up to ``jitter`` at random. For coroutines
+    a shared cache backend is read and written from the threadpool, since
+    its lookups are file or network I/O. A shared task
+    outlives the caller that started it, so it gets a ``db`` session of its
+    own rather than that caller's request session.
+
+    The wrapper also exposes ``key``, ``lookup`` (value or ``MISSING``),
+    ``store(value, ...)`` and ``invalidate`` taking the function's arguments,
+    for paths such as streaming that fill the cache themselves.
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        def make_key(*args, **kwargs) -> str:
+            if key is not None:
+                return hashed_key(namespace, *key(*args, **kwargs))
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return hashed_key(namespace, *((n, v) for n, v in bound.arguments.items() if n != "db"))
+
+        takes_db = "db" in signature.parameters
+
+        def remember(cache_key: str, value) -> None:
+            if cache_if is None or cache_if(value):
+                cache_instance.set(cache_key, value, ttl_seconds=jittered_ttl(ttl_seconds, jitter))
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_key = make_key(*args, **kwargs)
+                value = await _cache_io(cache_instance.get, cache_key, MISSING)
+                if value is not MISSING:
+                    return value
+
+                async def compute():
+                    if not takes_db:
+                        value = await func(*args, **kwargs)
+                    else:
+                        bound = signature.bind(*args, **kwargs)
+                        bound.arguments["db"] = session = SessionLocal()
+                        try:
+                            value = await func(*bound.args, **bound.kwargs)
+                        finally:
+                            session.close()
+                    await _cache_io(remember, cache_key, value)
+                    return value
+
+                return await (flights or _task_flights).run(namespace, cache_key, compute)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_key = make_key(*args, **kwargs)
+                value = cache_instance.get(cache_key, MISSING)
+                if value is not MISSING:
+                    return value
+
+                def compute():
+                    # Re-check: a thread that just finished this key may have stored it
+                    value = cache_instance.get(cache_key, MISSING)
+                    if value is MISSING:
+                        value = func(*args, **kwargs)
+                        remember(cache_key, value)
+                    return value
+
+                return _thread_flights.run(cache_key, compute)
+
+        wrapper.key = make_key
+        wrapper.lookup = lambda *args, **kwargs: cache_instance.get(make_key(*args, **kwargs), MISSING)
+        wrapper.store = lambda value, *args, **kwargs: remember(make_key(*args, **kwargs), value)
+        wrapper.invalidate = lambda *args, **kwargs: cache_instance.delete(make_key(*args, **kwargs))
+        return wrapper
+
+    return decorate
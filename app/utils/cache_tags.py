@@ -0,0 +1,87 @@
+"""Write-driven invalidation for cached aggregates.
+
+Every write path bumps a version counter per table it changes, inside its
+own transaction, so the bump commits (or rolls back) with the data. Cached
+entries record the versions of the tables they were computed from, and a
+read that finds any of them moved refreshes the entry (see
+``app.utils.refresher``). That picks up new numbers as soon as the write
+commits, in every worker, and lets the TTLs stay long.
+
+Counters exist per tenant (``orders:Sailor``), plus ``orders:*`` for writes
+that span tenants (backfills, bulk updates). A write bumps exactly one row
+per table, so writers for different tenants never wait on each other's
+counter. Tenant-scoped entries watch their tenant's counter and ``:*``, so
+another shop's orders never refresh them. Unscoped (all-tenant) entries
+watch the bare table tag, whose version is the sum of the table's counters.
+"""
+from sqlalchemy import BigInteger, Column, String, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import Base
+
+ALL_TENANTS = "*"
+
+
+class CacheTagVersion(Base):
+    __tablename__ = "cache_tag_versions"
+
+    tag = Column(String(150), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+def write_tags(table: str, source_website: str | None = None) -> list[str]:
+    return [f"{table}:{source_website or ALL_TENANTS}"]
+
+
+def read_tags(tables: tuple[str, ...], source_website: str | None = None) -> list[str]:
+    if source_website is None:
+        return list(tables) # table-wide: the sum of every tenant's counter
+    return [tag for table in tables for tag in (f"{table}:{source_website}", f"{table}:{ALL_TENANTS}")]
+
+
+def bump(db: Session, *tables: str, source_website: str | None = None) -> None:
+    """Advance the counters for ``tables`` in the caller's transaction (call just before commit).
+
+    The counter rows stay locked until the commit, so concurrent writers for
+    the same tenant and table queue briefly here; tags are sorted to keep
+    lock order consistent and rule out deadlocks.
+    """
+    tags = sorted({tag for table in tables for tag in write_tags(table, source_website)})
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        column = CacheTagVersion.__table__.c.version
+        for tag in tags:
+            stmt = insert(CacheTagVersion).values(tag=tag, version=1)
+            db.execute(stmt.on_conflict_do_update(index_elements=["tag"], set_={"version": column + 1}))
+        return
+
+    for tag in tags:
+        row = db.query(CacheTagVersion).filter_by(tag=tag).with_for_update().first()
+        if row is None:
+            db.add(CacheTagVersion(tag=tag, version=1))
+        else:
+            row.version += 1
+    db.flush()
+
+
+def versions(db: Session, tags: list[str]) -> dict[str, int]:
+    """Current counter per tag (0 for tags never written); one indexed query.
+
+    A bare table tag (``orders``) sums that table's per-tenant counters,
+    which moves on any tenant's write without a shared row to lock.
+    """
+    exact = [tag for tag in tags if ":" in tag]
+    tables = [tag for tag in tags if ":" not in tag]
+    rows = db.query(CacheTagVersion.tag, CacheTagVersion.version).filter(or_(
+        CacheTagVersion.tag.in_(exact),
+        *[CacheTagVersion.tag.startswith(f"{table}:", autoescape=True) for table in tables],
+    )).all()
+    found = dict(rows)
+    totals = {table: 0 for table in tables}
+    for tag, version in rows:
+        table = tag.partition(":")[0]
+        if table in totals:
+            totals[table] += version
+    return {tag: totals[tag] if tag in totals else found.get(tag, 0) for tag in tags}
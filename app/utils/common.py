@@ -1,3 +1,6 @@
+import base64
+import json
+
 from fastapi import Query
 
 
@@ -13,6 +16,36 @@ class PaginationParams:
         self.limit = limit
 
 
+class CursorParams:
+    """Dependency for cursor (keyset) pagination query parameters."""
+
+    def __init__(
+        self,
+        cursor: str | None = Query(None, description="Opaque cursor from the previous page"),
+        limit: int = Query(50, ge=1, le=500, description="Max records to return"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(payload: dict) -> str:
+    """Serialize a keyset position into an opaque, URL-safe cursor."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return payload
+
+
 def create_response(data, message: str = "Success", meta: dict | None = None) -> dict:
     """Wrap any payload in a standard API response envelope."""
     response: dict = {"message": message, "data": data}
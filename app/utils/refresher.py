@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.utils import cache_tags
+from app.utils.cache import LRUCache, cache_instance
+from app.utils.shared_cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """Stale-while-revalidate cache front with single-flight recomputation.
+
+    Values older than ``refresh_after`` are still served while one background
+    thread recomputes them with its own session. Only a cold miss (nothing
+    cached, or older than ``ttl_seconds``) blocks the caller, and concurrent
+    cold callers for the same key wait on a single computation.
+
+    With ``tags`` (see ``app.utils.cache_tags``) an entry computed before a
+    write to one of the tagged tables is dropped at once, however young: the
+    next read treats it as a cold miss.
+
+    Values the ``incomplete`` predicate flags (say, a snapshot missing a timed
+    out part) are kept for at most ``incomplete_ttl_seconds`` and refreshed
+    after ``incomplete_refresh_seconds``, so a transient failure is not cached
+    for the full TTL.
+    """
+
+    def __init__(
+        self,
+        cache: LRUCache | TieredCache = cache_instance,
+        cold_wait_seconds: float = 60,
+        incomplete_refresh_seconds: int = 60,
+        incomplete_ttl_seconds: int = 900,
+    ):
+        self._cache = cache
+        self._cold_wait_seconds = cold_wait_seconds
+        self._incomplete_refresh_seconds = incomplete_refresh_seconds
+        self._incomplete_ttl_seconds = incomplete_ttl_seconds
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {}
+
+    def get(
+        self,
+        key: str,
+        loader: Callable[[Session], Any],
+        db: Session,
+        refresh_after: int,
+        ttl_seconds: int,
+        tags: list[str] | None = None,
+        incomplete: Callable[[Any], bool] | None = None,
+    ) -> tuple[Any, float]:
+        """Return ``(value, age_seconds)`` for ``key``, computing it if needed."""
+        current = cache_tags.versions(db, tags) if tags else None
+        entry = self._cache.get(key)
+        if entry is not None and entry.get("versions") == current:
+            age = time.time() - entry["computed_at"]
+            if entry.get("incomplete"):
+                refresh_after = min(refresh_after, self._incomplete_refresh_seconds)
+            if age >= refresh_after:
+                self._refresh_in_background(key, loader, ttl_seconds, tags, incomplete)
+            return entry["value"], age
+
+        event, is_leader = self._claim(key)
+        if is_leader:
+            try:
+                return self._load(key, loader, db, ttl_seconds, tags, incomplete), 0.0
+            finally:
+                self._release(key, event)
+
+        waited_from = time.time()
+        event.wait(self._cold_wait_seconds)
+        entry = self._cache.get(key)
+        # Anything stored since we started waiting is the leader's result
+        if entry is not None and (entry.get("versions") == current or entry["computed_at"] >= waited_from):
+            return entry["value"], time.time() - entry["computed_at"]
+        # The leader failed or timed out; compute on this request instead
+        return self._load(key, loader, db, ttl_seconds, tags, incomplete), 0.0
+
+    def _claim(self, key: str) -> tuple[threading.Event, bool]:
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is not None:
+                return event, False
+            event = threading.Event()
+            self._inflight[key] = event
+            return event, True
+
+    def _release(self, key: str, event: threading.Event) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        event.set()
+
+    def _load(
+        self,
+        key: str,
+        loader: Callable[[Session], Any],
+        db: Session,
+        ttl_seconds: int,
+        tags: list[str] | None = None,
+        incomplete: Callable[[Any], bool] | None = None,
+    ):
+        # Read the versions first: a write that lands mid-computation leaves
+        # the entry behind the counters, so the next read recomputes it
+        stamp = cache_tags.versions(db, tags) if tags else None
+        value = loader(db)
+        partial = bool(incomplete and incomplete(value))
+        if partial:
+            ttl_seconds = min(ttl_seconds, self._incomplete_ttl_seconds)
+        self._cache.set(
+            key,
+            {"value": value, "computed_at": time.time(), "versions": stamp, "incomplete": partial},
+            ttl_seconds=ttl_seconds,
+        )
+        return value
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        loader: Callable[[Session], Any],
+        ttl_seconds: int,
+        tags: list[str] | None = None,
+        incomplete: Callable[[Any], bool] | None = None,
+    ) -> None:
+        event, is_leader = self._claim(key)
+        if not is_leader:
+            return
+
+        def run():
+            db = SessionLocal()
+            try:
+                self._load(key, loader, db, ttl_seconds, tags, incomplete)
+            except Exception:
+                logger.exception("Background refresh of %s failed", key)
+            finally:
+                db.close()
+                self._release(key, event)
+
+        threading.Thread(target=run, name=f"refresh:{key}", daemon=True).start()
+
+
+refresher = BackgroundRefresher()
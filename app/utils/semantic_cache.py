@@ -0,0 +1,313 @@
+import math
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+
+NGRAM_RANGE = (2, 4)
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case, drop punctuation/symbols (incl. the Bengali danda) and collapse spaces.
+
+    Bengali vowel signs are combining marks, not punctuation, so they survive.
+    """
+    cleaned = "".join(
+        " " if unicodedata.category(ch)[0] in "PSZC" else ch
+        for ch in unicodedata.normalize("NFC", text.lower())
+    )
+    return " ".join(cleaned.split())
+
+
+def numbers(text: str) -> frozenset:
+    """Digit runs in the text (Bengali digits included); "2 pcs" must not match "3 pcs"."""
+    return frozenset(word for word in text.split() if word.isdigit())
+
+
+# Words that change what a question asks while barely moving its n-grams
+# ("highest" vs "lowest", "red" vs "blue", "XL" vs "XXL", "available" vs
+# "not available"). Each maps to a canonical term; two questions can share an
+# answer only if they carry the same set of terms. Bengali words are matched
+# as stems, since they take suffixes (লালটা, কমে, বেশির).
+_QUALIFIERS = {
+    "not": ["no", "not", "never", "without", "none", "nothing", "nor", "t", "na", "nai", "nei", "না", "নেই", "নাই", "নয়", "নি"],
+    "red": ["red", "লাল"],
+    "blue": ["blue", "navy", "নীল"],
+    "green": ["green", "সবুজ"],
+    "black": ["black", "কালো"],
+    "white": ["white", "সাদা"],
+    "yellow": ["yellow", "হলুদ"],
+    "pink": ["pink", "গোলাপি"],
+    "purple": ["purple", "বেগুনি"],
+    "orange": ["orange", "কমলা"],
+    "brown": ["brown", "বাদামি"],
+    "gray": ["gray", "grey", "ছাই"],
+    "maroon": ["maroon", "মেরুন"],
+    "golden": ["gold", "golden", "সোনালি"],
+    "silver": ["silver", "রুপালি"],
+    "cream": ["cream", "beige"],
+    "xs": ["xs"],
+    "xl": ["xl"],
+    "xxl": ["xxl", "2xl"],
+    "xxxl": ["xxxl", "3xl"],
+    "small": ["small", "ছোট"],
+    "medium": ["medium"],
+    "large": ["large", "big", "বড়"],
+    "highest": ["highest", "maximum", "max", "peak", "সর্বোচ্চ"],
+    "lowest": ["lowest", "minimum", "min", "সর্বনিম্ন"],
+    "most": ["most", "top", "best", "সেরা", "সবচেয়ে"],
+    "least": ["least", "bottom", "worst"],
+    "more": ["more", "higher", "greater", "over", "above", "বেশি"],
+    "less": ["less", "lower", "fewer", "under", "below", "কম"],
+    "increase": ["increase", "increasing", "increased", "rise", "rising", "grow", "growing", "growth", "up", "raise", "বাড়"],
+    "decrease": ["decrease", "decreasing", "decreased", "fall", "falling", "drop", "dropping", "decline", "declining", "down", "reduce", "কমা", "কমছে", "কমেছে"],
+    "cheapest": ["cheapest", "cheap", "সস্তা"],
+    "expensive": ["expensive", "costliest", "দামি"],
+}
+# The colour and size terms among them, for matching a question to a product variant
+VARIANT_TERMS = frozenset({
+    "red", "blue", "green", "black", "white", "yellow", "pink", "purple", "orange", "brown", "gray", "maroon",
+    "golden", "silver", "cream", "xs", "xl", "xxl", "xxxl", "small", "medium", "large",
+})
+_SIZE_LETTERS = {"s": "small", "m": "medium", "l": "large"}
+_SIZE_WORDS = {"size", "সাইজ"}
+_BENGALI_NEGATION_SUFFIX = "নি"
+
+_EXACT_QUALIFIERS: dict[str, str] = {}
+_STEM_QUALIFIERS: list[tuple[str, str]] = []
+for _term, _words in _QUALIFIERS.items():
+    for _word in _words:
+        _word = normalize_text(_word)
+        if _word.isascii() or _term == "not":
+            _EXACT_QUALIFIERS[_word] = _term
+        else:
+            _STEM_QUALIFIERS.append((_word, _term))
+_STEM_QUALIFIERS.sort(key=lambda pair: -len(pair[0])) # longest stem first: কমলা before কম
+
+
+def qualifiers(text: str) -> frozenset:
+    """Numbers plus the canonical negation, colour, size and polar terms in normalized ``text``."""
+    terms = set(numbers(text))
+    previous = ""
+    for word in text.split():
+        term = _EXACT_QUALIFIERS.get(word)
+        if term is None and not word.isascii():
+            term = next((term for stem, term in _STEM_QUALIFIERS if word.startswith(stem)), None)
+            if term is None and word.endswith(_BENGALI_NEGATION_SUFFIX):
+                term = "not" # হয়নি, পাইনি
+        if term is None and previous in _SIZE_WORDS:
+            term = _SIZE_LETTERS.get(word) # "size m", but not the "s" of "what's"
+        if term is not None:
+            terms.add(term)
+        previous = word
+    return frozenset(terms)
+
+
+def char_ngrams(text: str) -> Counter:
+    """Character n-gram counts of each word padded with spaces (like ``char_wb``)."""
+    grams = Counter()
+    low, high = NGRAM_RANGE
+    for word in text.split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+@dataclass
+class _Entry:
+    text: str
+    grams: Counter
+    qualifiers: frozenset
+    answer: str
+    expires_at: float
+    # TF-IDF weights and norm, valid while the namespace generation is unchanged
+    vector: tuple[dict[str, float], float] | None = None
+    generation: int = -1
+
+
+class _Namespace:
+    """Entries for one context (product, tenant) plus an n-gram inverted index.
+
+    Entries are also grouped by their qualifier set: only questions with the
+    same numbers, negations, colours and sizes are ever compared.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[int, _Entry] = OrderedDict()
+        self.postings: dict[str, set[int]] = {}
+        self.by_qualifiers: dict[frozenset, set[int]] = {}
+        self.doc_freq: Counter = Counter()
+        self.generation = 0 # bumped whenever the IDF weights change
+
+    def add(self, entry_id: int, entry: _Entry) -> None:
+        self.entries[entry_id] = entry
+        self.by_qualifiers.setdefault(entry.qualifiers, set()).add(entry_id)
+        for gram in entry.grams:
+            self.postings.setdefault(gram, set()).add(entry_id)
+            self.doc_freq[gram] += 1
+        self.generation += 1
+
+    def remove(self, entry_id: int) -> None:
+        entry = self.entries.pop(entry_id)
+        group = self.by_qualifiers[entry.qualifiers]
+        group.discard(entry_id)
+        if not group:
+            del self.by_qualifiers[entry.qualifiers]
+        for gram in entry.grams:
+            ids = self.postings[gram]
+            ids.discard(entry_id)
+            if not ids:
+                del self.postings[gram]
+            self.doc_freq[gram] -= 1
+            if self.doc_freq[gram] <= 0:
+                del self.doc_freq[gram]
+        self.generation += 1
+
+    def idf(self, gram: str) -> float:
+        # Smoothed IDF; a gram no stored question has gets the highest weight,
+        # so a word the cached question lacks counts fully against the match
+        return math.log((1 + len(self.entries)) / (1 + self.doc_freq.get(gram, 0))) + 1.0
+
+    def vector(self, grams: Counter) -> tuple[dict[str, float], float]:
+        weights = {gram: count * self.idf(gram) for gram, count in grams.items()}
+        return weights, math.sqrt(sum(w * w for w in weights.values()))
+
+    def entry_vector(self, entry: _Entry) -> tuple[dict[str, float], float]:
+        if entry.generation != self.generation:
+            entry.vector, entry.generation = self.vector(entry.grams), self.generation
+        return entry.vector
+
+
+class SemanticCache:
+    """Offline similarity cache: char n-gram TF-IDF vectors compared by cosine.
+
+    Answers are grouped per namespace (e.g. one product for the chatbot, one
+    tenant for the advisor) so a similar question about another product never
+    matches. Within a namespace only entries with the same qualifiers (see
+    ``qualifiers``) that share an n-gram are scored, and entry vectors are
+    reused until the namespace changes. Entries per namespace and the number
+    of namespaces are both capped (least recently used goes first), and each
+    namespace has its own lock. Lookups are CPU work: call them from a thread
+    (``run_in_threadpool``), not on the event loop.
+    """
+
+    _BUCKETS = 10
+
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries_per_namespace: int = settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        max_namespaces: int = settings.SEMANTIC_CACHE_MAX_NAMESPACES,
+    ):
+        self.threshold = threshold
+        self.max_entries_per_namespace = max_entries_per_namespace
+        self.max_namespaces = max_namespaces
+        self._namespaces: OrderedDict[str, _Namespace] = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+        self._guarded = 0
+        # Best similarity seen per lookup, bucketed by tenths, split by outcome
+        self._hit_similarity = [0] * self._BUCKETS
+        self._miss_similarity = [0] * self._BUCKETS
+
+    def _namespace(self, namespace: str, create: bool = False) -> _Namespace | None:
+        with self._lock:
+            space = self._namespaces.get(namespace)
+            if space is not None:
+                self._namespaces.move_to_end(namespace)
+            elif create:
+                space = self._namespaces[namespace] = _Namespace()
+                while len(self._namespaces) > self.max_namespaces:
+                    self._namespaces.popitem(last=False)
+            return space
+
+    def lookup(self, namespace: str, text: str) -> tuple[str | None, float]:
+        """Return ``(answer, similarity)`` of the closest live entry at or above the threshold."""
+        normalized = normalize_text(text)
+        grams, terms = char_ngrams(normalized), qualifiers(normalized)
+        now = time.time()
+        space = self._namespace(namespace)
+        best_entry, best, guarded = None, 0.0, False
+        if space is not None and grams:
+            with space.lock:
+                candidates = set()
+                for gram in grams:
+                    candidates |= space.postings.get(gram, set())
+                comparable = candidates & space.by_qualifiers.get(terms, set())
+                guarded = len(comparable) < len(candidates)
+                for entry_id in [i for i in comparable if space.entries[i].expires_at <= now]:
+                    space.remove(entry_id)
+                    comparable.discard(entry_id)
+                query, query_norm = space.vector(grams)
+                best_id = None
+                for entry_id in comparable:
+                    weights, norm = space.entry_vector(space.entries[entry_id])
+                    dot = sum(w * weights.get(gram, 0.0) for gram, w in query.items())
+                    similarity = dot / (query_norm * norm) if norm and query_norm else 0.0
+                    if similarity > best:
+                        best_id, best = entry_id, similarity
+                if best_id is not None and best >= self.threshold:
+                    space.entries.move_to_end(best_id)
+                    best_entry = space.entries[best_id]
+
+        bucket = min(int(best * self._BUCKETS), self._BUCKETS - 1)
+        with self._lock:
+            self._guarded += guarded
+            if best_entry is not None:
+                self._hits += 1
+                self._hit_similarity[bucket] += 1
+                return best_entry.answer, best
+            self._misses += 1
+            self._miss_similarity[bucket] += 1
+            return None, best
+
+    def store(self, namespace: str, text: str, answer: str, ttl_seconds: int = 3600) -> None:
+        normalized = normalize_text(text)
+        grams = char_ngrams(normalized)
+        if not grams:
+            return
+        entry = _Entry(text, grams, qualifiers(normalized), answer, time.time() + ttl_seconds)
+        space = self._namespace(namespace, create=True)
+        with self._lock:
+            self._next_id += 1
+            entry_id = self._next_id
+        with space.lock:
+            while len(space.entries) >= self.max_entries_per_namespace:
+                space.remove(next(iter(space.entries))) # least recently used
+            space.add(entry_id, entry)
+
+    def invalidate(self, namespace: str | None = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._namespaces.clear()
+            else:
+                self._namespaces.pop(namespace, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            buckets = [f"{i / self._BUCKETS:.1f}-{(i + 1) / self._BUCKETS:.1f}" for i in range(self._BUCKETS)]
+            spaces = list(self._namespaces.values())
+            return {
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                # Lookups where a candidate was skipped for differing numbers, negations, colours or sizes
+                "qualifier_mismatches": self._guarded,
+                "namespaces": len(spaces),
+                "entries": sum(len(s.entries) for s in spaces),
+                "hit_similarity": dict(zip(buckets, self._hit_similarity)),
+                "miss_similarity": dict(zip(buckets, self._miss_similarity)),
+            }
+
+
+semantic_cache = SemanticCache()
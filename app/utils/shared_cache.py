@@ -0,0 +1,329 @@
+"""Cache tiers shared by every worker process.
+
+With several uvicorn/gunicorn workers each one has its own ``LRUCache``, so
+insights, business context and model answers are computed (and paid for)
+once per worker, and a delete only reaches the worker that issued it.
+``TieredCache`` keeps a small in-process L1 in front of a shared L2 store:
+
+* ``SQLiteCacheStore`` - a WAL-mode SQLite file, for workers on one host.
+* ``RedisCacheStore`` - any server speaking the Redis protocol (Redis,
+  Valkey, KeyDB, or a local stand-in), via a minimal built-in client.
+
+L1 copies live for ``CACHE_L1_TTL_SECONDS``, which bounds how long another
+worker's write or delete takes to show up. Values cross the L2 boundary as
+pickles, zlib-compressed above ``CACHE_COMPRESS_MIN_BYTES`` and signed with
+``SECRET_KEY`` so a payload written by anything else is never unpickled.
+An unreachable L2 degrades to L1-only caching instead of failing requests.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from urllib.parse import unquote, urlsplit
+
+from app.config import settings
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_RAW, _ZLIB = b"\x01", b"\x02"
+_ABSENT = object()
+_MAC_BYTES = 16
+
+
+def _mac(payload: bytes) -> bytes:
+    return hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()[:_MAC_BYTES]
+
+
+def dumps(value) -> bytes:
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    kind = _RAW
+    if len(payload) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload, 1) # fast level; cached values are mostly text and frames
+        if len(compressed) < len(payload):
+            payload, kind = compressed, _ZLIB
+    return kind + _mac(payload) + payload
+
+
+def loads(data: bytes):
+    """Inverse of ``dumps``; raises ValueError for payloads this app did not sign."""
+    kind, mac, payload = data[:1], data[1:1 + _MAC_BYTES], data[1 + _MAC_BYTES:]
+    if kind not in (_RAW, _ZLIB) or not hmac.compare_digest(mac, _mac(payload)):
+        raise ValueError("cache payload failed verification")
+    if kind == _ZLIB:
+        payload = zlib.decompress(payload)
+    return pickle.loads(payload)
+
+
+class SQLiteCacheStore:
+    """Byte store in a SQLite file; every worker on the host opens the same file."""
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str = "",
+        timeout_seconds: float = settings.CACHE_L2_TIMEOUT_SECONDS,
+        sweep_interval_seconds: float = settings.CACHE_SWEEP_INTERVAL_SECONDS,
+    ):
+        if path.startswith("sqlite:///"):
+            path = path[len("sqlite:///"):]
+        self.path = path or os.path.join(tempfile.gettempdir(), "ecom-cache.sqlite3")
+        self.timeout_seconds = timeout_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._local = threading.local()
+        self._swept_at = time.monotonic()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout_seconds, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL") # a lost cache write after a power cut is harmless
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, data: bytes, ttl_seconds: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, data, time.time() + ttl_seconds),
+        )
+        if time.monotonic() - self._swept_at >= self.sweep_interval_seconds:
+            self._swept_at = time.monotonic()
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache_entries")
+
+
+class RedisError(Exception):
+    """The server answered a command with an error reply."""
+
+
+class _RespConnection:
+    def __init__(self, host: str, port: int, password: str | None, db: int, timeout: float):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            arg = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed mid-reply")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RedisError(rest.decode(errors="replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else self._file.read(length + 2)[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise ConnectionError(f"unexpected reply {line[:40]!r}")
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+
+class RedisCacheStore:
+    """Byte store on a Redis-protocol server; keys are prefixed so ``clear`` only touches ours."""
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = "",
+        timeout_seconds: float = settings.CACHE_L2_TIMEOUT_SECONDS,
+        prefix: str = "ecom:cache:",
+    ):
+        parts = urlsplit(url or "redis://localhost:6379/0")
+        self._address = (
+            parts.hostname or "localhost",
+            parts.port or 6379,
+            unquote(parts.password) if parts.password else None,
+            int(parts.path.strip("/") or 0),
+        )
+        self.timeout_seconds = timeout_seconds
+        self.prefix = prefix
+        self._local = threading.local()
+        self._command("PING") # fail fast at startup when the server is unreachable
+
+    def _command(self, *args):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _RespConnection(*self._address, self.timeout_seconds)
+        try:
+            return conn.command(*args)
+        except RedisError:
+            raise
+        except Exception:
+            # A timed-out or broken connection may hold half a reply; start over next time
+            self._local.conn = None
+            conn.close()
+            raise
+
+    def get(self, key: str) -> bytes | None:
+        return self._command("GET", self.prefix + key)
+
+    def set(self, key: str, data: bytes, ttl_seconds: float) -> None:
+        self._command("SET", self.prefix + key, data, "PX", max(1, int(ttl_seconds * 1000)))
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", self.prefix + key)
+
+    def clear(self) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == b"0":
+                break
+
+
+class TieredCache:
+    """``LRUCache`` API over an in-process L1 and a shared L2 store.
+
+    L2 failures are logged, counted and treated as misses. After a connection
+    error, timeout or lock wait the store is left alone for ``retry_seconds``,
+    so an outage costs one timeout, not one per request. Calls block on the
+    store; async code should make them from a thread. ``l1_ttl_seconds=0``
+    skips the L1 copy, for state several workers update in turn.
+    """
+
+    def __init__(
+        self,
+        store,
+        l1: LRUCache | None = None,
+        l1_ttl_seconds: float = settings.CACHE_L1_TTL_SECONDS,
+        retry_seconds: float = 10.0,
+    ):
+        self.store = store
+        self.l1 = l1 or LRUCache()
+        self.l1_ttl_seconds = l1_ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._errors = self._writes = 0
+        self._bytes_written = 0
+
+    def _l2(self, op: str, *args):
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return getattr(self.store, op)(*args)
+        except Exception as exc:
+            with self._lock:
+                self._errors += 1
+            if isinstance(exc, (OSError, sqlite3.OperationalError)):
+                # Unreachable, timed out, or a SQLite file locked past the busy
+                # timeout: each further call would block as long again, so back off
+                self._down_until = time.monotonic() + self.retry_seconds
+            logger.warning("Shared cache %s %s failed, using the local cache only: %s", self.store.name, op, exc)
+            return None
+
+    def get(self, key: str, default=None):
+        value = self.l1.get(key, _ABSENT) if self.l1_ttl_seconds > 0 else _ABSENT
+        if value is not _ABSENT:
+            return value
+        data = self._l2("get", key)
+        if data is None:
+            with self._lock:
+                self._misses += 1
+            return default
+        try:
+            value = loads(data)
+        except Exception as exc:
+            logger.warning("Discarding unreadable shared cache entry %s: %s", key, exc)
+            self._l2("delete", key)
+            with self._lock:
+                self._misses += 1
+            return default
+        with self._lock:
+            self._hits += 1
+        if self.l1_ttl_seconds > 0:
+            self.l1.set(key, value, ttl_seconds=self.l1_ttl_seconds)
+        return value
+
+    def set(self, key: str, value, ttl_seconds: int = 3600):
+        if self.l1_ttl_seconds > 0:
+            self.l1.set(key, value, ttl_seconds=min(ttl_seconds, self.l1_ttl_seconds))
+        data = dumps(value)
+        self._l2("set", key, data, ttl_seconds)
+        with self._lock:
+            self._writes += 1
+            self._bytes_written += len(data)
+
+    def delete(self, key: str):
+        self.l1.delete(key)
+        self._l2("delete", key)
+
+    def clear(self):
+        self.l1.clear()
+        self._l2("clear")
+
+    def close(self):
+        self.l1.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": self.store.name,
+                "l1": self.l1.stats(),
+                "l2": {
+                    "hits": self._hits,
+                    "misses": self._misses,
+                    "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                    "writes": self._writes,
+                    "avg_bytes_written": self._bytes_written // self._writes if self._writes else 0,
+                    "errors": self._errors,
+                    "available": time.monotonic() >= self._down_until,
+                },
+            }
+
+
+SHARED_STORES = {
+    "sqlite": SQLiteCacheStore,
+    "redis": RedisCacheStore,
+}
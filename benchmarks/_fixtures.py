@@ -0,0 +1,117 @@
+"""Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file by default so they need no
+PostgreSQL server. Point ``DATABASE_URL`` at a scratch Postgres database to
+benchmark the production dialect instead. Never point it at real data: the
+schema is dropped and recreated.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'ecom_bench.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import app.auth.models  # noqa: E402,F401
+import app.users.models  # noqa: E402,F401
+import app.products.models  # noqa: E402,F401
+import app.orders.models  # noqa: E402,F401
+import app.analytics.models  # noqa: E402,F401
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.orders.models import Order, OrderDetail  # noqa: E402
+from app.products.models import Product  # noqa: E402
+from app.users.models import User, UserAddress  # noqa: E402
+
+DISTRICTS = ["Dhaka", "Chattogram", "Rangpur", "Sylhet", "Khulna", "Rajshahi", "Barishal", "Mymensingh"]
+SOURCES = ["Sailor", "Rise"]
+PRODUCT_WORDS = ["Linen", "Cotton", "Silk", "Panjabi", "Shirt", "Saree", "Kurti", "Polo", "Denim", "Kids"]
+CATEGORIES = ["Panjabi", "Shirt", "Saree", "Kurti", "Accessories"]
+
+
+def reset_schema() -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def seed(
+    order_lines: int,
+    n_products: int = 500,
+    n_users: int = 2000,
+    days: int = 30,
+    lines_per_order: int = 3,
+    seed_value: int = 42,
+) -> None:
+    """Bulk-insert a synthetic store with roughly ``order_lines`` order lines."""
+    rnd = random.Random(seed_value)
+    reset_schema()
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "name": f"Customer {i}", "phone": "01700000000", "email": f"c{i}@example.com",
+             "source_website": rnd.choice(SOURCES), "created_at": now, "updated_at": now}
+            for i in range(1, n_users + 1)
+        ])
+        conn.execute(UserAddress.__table__.insert(), [
+            {"user_id": i, "country": "Bangladesh", "city": "City", "district": rnd.choice(DISTRICTS),
+             "address": "-", "is_default": True, "created_at": now, "updated_at": now}
+            for i in range(1, n_users + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [
+            {"id": i, "product_name": " ".join(rnd.sample(PRODUCT_WORDS, 2)) + f" {i}",
+             "price": rnd.randint(300, 3000), "sku": f"SKU-{i}", "category": rnd.choice(CATEGORIES),
+             "stock_quantity": rnd.randint(0, 200), "min_stock_level": 5,
+             "source_website": rnd.choice(SOURCES), "is_active": True,
+             "created_at": now - timedelta(days=days * 3), "updated_at": now}
+            for i in range(1, n_products + 1)
+        ])
+
+        n_orders = max(1, order_lines // lines_per_order)
+        batch = 20000
+        line_id = 1
+        for start in range(1, n_orders + 1, batch):
+            orders, lines = [], []
+            for order_id in range(start, min(start + batch, n_orders + 1)):
+                created_at = now - timedelta(seconds=rnd.random() * days * 86400)
+                orders.append({
+                    "id": order_id, "order_number": f"ORD-{order_id}", "user_id": rnd.randint(1, n_users),
+                    "total_amount": 0, "status": "delivered", "source_website": rnd.choice(SOURCES),
+                    "created_at": created_at, "updated_at": created_at,
+                })
+                for _ in range(lines_per_order):
+                    quantity = rnd.randint(1, 4)
+                    unit_price = rnd.randint(300, 3000)
+                    lines.append({
+                        "id": line_id, "order_id": order_id, "product_id": rnd.randint(1, n_products),
+                        "quantity": quantity, "unit_price": unit_price, "total_price": quantity * unit_price,
+                        "created_at": created_at, "updated_at": created_at,
+                    })
+                    line_id += 1
+            conn.execute(Order.__table__.insert(), orders)
+            conn.execute(OrderDetail.__table__.insert(), lines)
+
+
+@contextmanager
+def session():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def timed(fn, repeat: int = 3):
+    """Return (best_seconds, last_result) over ``repeat`` runs."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
@@ -0,0 +1,74 @@
+"""Benchmark the Smart Ad Target insight: legacy pandas path vs SQL aggregate.
+
+Usage:
+    python benchmarks/bench_ad_target.py                    # 10k, 100k, 1M lines
+    python benchmarks/bench_ad_target.py --sizes 10000 50000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import _fixtures  # noqa: F401  (configures the benchmark database)
+import pandas as pd
+from _fixtures import seed, session, timed
+
+from app.analytics.service import rebuild_daily_sales_rollup
+from app.insights.service import InsightService
+from app.orders.models import Order, OrderDetail
+from app.products.models import Product
+from app.users.models import User, UserAddress
+
+
+def legacy_ad_target_insights(db):
+    """The pre-rollup implementation: raw order lines -> DataFrame -> groupby/merge/iterrows."""
+    now = datetime.now()
+    three_days_ago = now - timedelta(days=3)
+    six_days_ago = now - timedelta(days=6)
+
+    results = db.query(
+        Order.created_at,
+        UserAddress.district,
+        Product.product_name,
+        OrderDetail.quantity
+    ).join(OrderDetail, Order.id == OrderDetail.order_id)\
+     .join(Product, OrderDetail.product_id == Product.id)\
+     .join(User, Order.user_id == User.id)\
+     .join(UserAddress, User.id == UserAddress.user_id)\
+     .filter(Order.created_at >= six_days_ago).all()
+    if not results:
+        return []
+
+    df = pd.DataFrame(results, columns=['created_at', 'district', 'product_name', 'quantity'])
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    recent_df = df[df['created_at'] >= three_days_ago]
+    prev_df = df[(df['created_at'] < three_days_ago) & (df['created_at'] >= six_days_ago)]
+    recent_grouped = recent_df.groupby(['district', 'product_name'])['quantity'].sum().reset_index()
+    prev_grouped = prev_df.groupby(['district', 'product_name'])['quantity'].sum().reset_index()
+    merged = pd.merge(recent_grouped, prev_grouped, on=['district', 'product_name'], how='left', suffixes=('_recent', '_prev')).fillna(0)
+
+    hits = []
+    for _, row in merged.iterrows():
+        recent_q, prev_q = row['quantity_recent'], row['quantity_prev']
+        growth = recent_q / prev_q if prev_q > 0 else (recent_q if recent_q >= 2 else 0)
+        if growth >= 1.5:
+            hits.append((row['district'], row['product_name'], growth))
+    return hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'order lines':>12} {'legacy (s)':>12} {'aggregate (s)':>14} {'speedup':>9} {'rollup rows':>12}")
+    for size in args.sizes:
+        seed(size, days=14)
+        with session() as db:
+            rollup_rows = rebuild_daily_sales_rollup(db)
+            legacy_s, _ = timed(lambda: legacy_ad_target_insights(db), args.repeat)
+            new_s, _ = timed(lambda: InsightService.get_ad_target_insights(db), args.repeat)
+        print(f"{size:>12,} {legacy_s:>12.4f} {new_s:>14.4f} {legacy_s / new_s:>8.1f}x {rollup_rows:>12,}")
+
+
+if __name__ == "__main__":
+    main()
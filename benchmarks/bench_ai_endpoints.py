@@ -0,0 +1,170 @@
+"""Load-test the AI endpoints against the offline fake model.
+
+Drives POST /advisor/ask, POST /chatbot/ask and GET /admin/sentiment/{id}
+in-process (httpx over ASGI, no network, no Google calls) at several
+concurrency levels and reports p50/p95/p99 latency and throughput. The fake
+backend's latency and token rate stand in for the real model, so the numbers
+show how the LLM client's slot limits, the caches and coalescing behave
+under load. Use them to size LLM_MAX_CONCURRENCY / LLM_FEATURE_CONCURRENCY
+and the worker count before a sale.
+
+Usage:
+    python benchmarks/bench_ai_endpoints.py
+    python benchmarks/bench_ai_endpoints.py --concurrency 8 32 128 --requests 400 \\
+        --latency 0.8 --tokens-per-second 40 --repeat-share 0.3
+"""
+import os
+
+os.environ.setdefault("LLM_PROVIDER", "fake")  # never reach Google from a benchmark
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import _fixtures  # noqa: F401  (configures the benchmark database)
+import httpx
+import numpy as np
+from _fixtures import engine, seed
+from fastapi import FastAPI
+
+from app.admin_router import router as admin_router
+from app.advisor.router import router as advisor_router
+from app.analytics.service import rebuild_daily_sales_rollup
+from app.chatbot.router import router as chatbot_router
+from app.database import SessionLocal
+from app.llm.backends import FakeBackend
+from app.llm.client import llm_client
+from app.llm.coalesce import llm_flights
+from app.products.models import ProductReview
+
+REVIEW_TEXTS = [
+    ("খুব ভালো পণ্য, দ্রুত ডেলিভারি।", 5),
+    ("কাপড়ের মান খারাপ, রং উঠে গেছে।", 1),
+    ("মোটামুটি, দাম অনুযায়ী চলে।", 3),
+    ("Great fit, highly recommend!", 5),
+    ("Arrived late and the box was damaged.", 2),
+    ("Received it today.", 4), # no lexicon evidence: goes to the model
+    ("Amazing!!", 1), # text and stars disagree: goes to the model
+]
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    for router in (advisor_router, chatbot_router, admin_router):
+        app.include_router(router, prefix="/api/v1")
+    return app
+
+
+def seed_reviews(n_products: int, per_product: int, seed_value: int = 42) -> None:
+    rnd = random.Random(seed_value)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(ProductReview.__table__.insert(), [
+            {"product_id": product_id, "customer_name": "Customer", "rating": rating,
+             "review_text": text, "created_at": now}
+            for product_id in range(1, n_products + 1)
+            for text, rating in rnd.choices(REVIEW_TEXTS, k=per_product)
+        ])
+
+
+class Workload:
+    """Request factory: mostly unique questions, ``repeat_share`` drawn from a small popular pool."""
+
+    def __init__(self, repeat_share: float, n_products: int, seed_value: int = 7):
+        self.repeat_share = repeat_share
+        self.n_products = n_products
+        self._random = random.Random(seed_value)
+        self._counter = 0
+
+    def _unique(self) -> int:
+        self._counter += 1
+        return self._counter
+
+    def _popular(self) -> bool:
+        return self._random.random() < self.repeat_share
+
+    def request(self, endpoint: str) -> tuple[str, str, dict | None]:
+        if endpoint == "advisor":
+            n = self._random.randint(1, 5) if self._popular() else self._unique()
+            return "POST", "/api/v1/advisor/ask", {"query": f"Which district should I target for campaign {n}?"}
+        if endpoint == "chatbot":
+            n = self._random.randint(1, 5) if self._popular() else self._unique()
+            return "POST", "/api/v1/chatbot/ask", {"message": f"আমার অর্ডার {n} কবে পৌঁছাবে?"}
+        if self._popular():
+            product_id = self._random.randint(1, 5)
+        else:
+            product_id = 5 + self._unique() % (self.n_products - 5)
+        return "GET", f"/api/v1/admin/sentiment/{product_id}", None
+
+
+async def drive(client: httpx.AsyncClient, workload: Workload, endpoint: str, concurrency: int, total: int):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(workload.request(endpoint))
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            method, url, body = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+async def run(args) -> None:
+    workload = Workload(args.repeat_share, args.products)
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'endpoint':>9} {'conc':>5} {'reqs':>5} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = await drive(client, workload, endpoint, concurrency, args.requests)
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+                print(f"{endpoint:>9} {concurrency:>5} {len(latencies):>5} {errors:>6} "
+                      f"{p50:>8.0f} {p95:>8.0f} {p99:>8.0f} {len(latencies) / elapsed:>8.1f}")
+    print("\nmodel calls per feature:", llm_flights.stats()["features"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", default=["advisor", "chatbot", "sentiment"],
+                        choices=["advisor", "chatbot", "sentiment"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--requests", type=int, default=120, help="requests per endpoint and level")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--output-tokens", type=int, default=40)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--repeat-share", type=float, default=0.2,
+                        help="share of requests repeating a popular question (cache/coalescing hits)")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--reviews-per-product", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(order_lines=20_000, n_products=args.products, days=30)
+    seed_reviews(args.products, args.reviews_per_product)
+    with SessionLocal() as db:
+        rebuild_daily_sales_rollup(db)
+
+    llm_client.backend = FakeBackend(
+        latency_seconds=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        failure_rate=args.failure_rate,
+    )
+    print(f"fake model: {args.latency}s to first token, {args.tokens_per_second} tokens/s, "
+          f"{args.output_tokens} tokens; limits: {llm_client._max_concurrency} global, "
+          f"{llm_client._feature_concurrency} per feature\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the vectorized price-elasticity engine.
+
+Fits synthetic catalogs with known elasticities and reports fit time and
+recovery error. ``--with-db`` also times the full path (rollup + price
+history -> matrices -> fit) against the benchmark database.
+
+Usage:
+    python benchmarks/bench_pricing.py
+    python benchmarks/bench_pricing.py --skus 10000 50000 100000 --with-db
+"""
+import argparse
+import time
+
+import _fixtures  # noqa: F401  (configures the benchmark database)
+import numpy as np
+from _fixtures import seed, session
+
+from app.analytics.service import rebuild_daily_sales_rollup
+from app.insights.pricing import estimate_elasticities, load_price_quantity_matrices, suggest_prices
+
+
+def synthetic_catalog(skus: int, days: int, rng: np.random.Generator):
+    true_elasticity = rng.uniform(-2.5, -0.2, skus)
+    base_price = rng.uniform(300, 3000, skus)
+    base_demand = rng.uniform(2, 40, skus)
+    # Half the catalog runs price experiments (+-15%), the rest never changes price
+    varies = rng.random(skus) < 0.5
+    jitter = rng.uniform(-0.15, 0.15, (skus, days)) * varies[:, None]
+    price = base_price[:, None] * (1 + jitter)
+    demand = base_demand[:, None] * (price / base_price[:, None]) ** true_elasticity[:, None]
+    quantity = rng.poisson(demand).astype(float)
+    return true_elasticity, base_price, price, quantity
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--with-db", action="store_true")
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    print(f"{'SKUs':>9} {'fit+suggest (s)':>16} {'SKUs/s':>12} {'median |err|':>13} {'identified':>11}")
+    for skus in args.skus:
+        true_e, base_price, price, quantity = synthetic_catalog(skus, args.days, rng)
+        start = time.perf_counter()
+        estimate = estimate_elasticities(price, quantity)
+        suggest_prices(base_price, estimate)
+        elapsed = time.perf_counter() - start
+
+        identified = np.isfinite(estimate.elasticity)
+        # log(1 + q) attenuates the slope for low-volume SKUs; compare on busy ones
+        busy = identified & (quantity.mean(axis=1) >= 10)
+        error = np.median(np.abs(estimate.elasticity[busy] - true_e[busy])) if busy.any() else float("nan")
+        print(f"{skus:>9,} {elapsed:>16.4f} {skus / elapsed:>12,.0f} {error:>13.3f} {identified.mean():>10.0%}")
+
+    if args.with_db:
+        print("\nend to end (rollup + history -> matrices -> fit)")
+        for skus in args.skus:
+            seed(order_lines=skus * 4, n_products=skus, days=60)
+            with session() as db:
+                rebuild_daily_sales_rollup(db)
+                start = time.perf_counter()
+                _, _, current_price, price, quantity = load_price_quantity_matrices(db)
+                loaded = time.perf_counter()
+                suggest_prices(current_price, estimate_elasticities(price, quantity))
+                done = time.perf_counter()
+            print(f"{skus:>9,} SKUs: load {loaded - start:.3f}s, fit {done - loaded:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark the offline review sentiment lexicon.
+
+Scores a small hand-labeled set of Bengali, romanized Bengali and English
+reviews and reports accuracy overall and on the reviews confident enough to
+skip the model. It then replicates the set to time throughput at scale.
+
+Usage:
+    python benchmarks/bench_review_lexicon.py
+    python benchmarks/bench_review_lexicon.py --sizes 10000 100000 --min-confidence 0.5
+"""
+import argparse
+import time
+
+import _fixtures  # noqa: F401  (configures the app settings)
+
+from app.config import settings
+from app.reviews.lexicon import score_reviews
+
+# (review text, star rating or None, expected label)
+LABELED_REVIEWS = [
+    ("পণ্যটি খুব ভালো, ডেলিভারিও দ্রুত পেয়েছি।", 5, "positive"),
+    ("কাপড়ের মান অসাধারণ, আবার কিনবো।", 5, "positive"),
+    ("দারুণ পাঞ্জাবি, পরতে আরামদায়ক।", None, "positive"),
+    ("একদম পারফেক্ট সাইজ, ধন্যবাদ।", 4, "positive"),
+    ("টাকা উসুল, খুবই সন্তুষ্ট।", None, "positive"),
+    ("রং খুব সুন্দর, ছবির মতোই।", 5, "positive"),
+    ("খুব খারাপ কাপড়, টাকা নষ্ট।", 1, "negative"),
+    ("এক ধোয়াতেই রং উঠে গেছে।", 1, "negative"),
+    ("ডেলিভারি অনেক দেরিতে এসেছে, প্যাকেট ছেঁড়া ছিল।", 2, "negative"),
+    ("ভুয়া প্রোডাক্ট, ছবির সাথে মিল নেই।", None, "negative"),
+    ("সাইজ ছোট, ফেরত দিতে চাই।", 2, "negative"),
+    ("কাপড়টা ভালো না।", None, "negative"),
+    ("মোটামুটি, দাম অনুযায়ী চলে।", 3, "neutral"),
+    ("ঠিকঠাক আছে।", 3, "neutral"),
+    ("সাধারণ মানের, বিশেষ কিছু না।", 3, "neutral"),
+    ("বাজে সার্ভিস, আর কখনো কিনবো না।", 1, "negative"),
+    ("অর্ডার করেছিলাম নীল, পেয়েছি কালো। ভুল পণ্য।", 2, "negative"),
+    ("প্রত্যাশার চেয়ে ভালো ছিল।", 4, "positive"),
+    ("হতাশ হয়েছি, মান খুব নিম্নমানের।", 1, "negative"),
+    ("সুন্দর প্যাকেজিং, দ্রুত ডেলিভারি।", 5, "positive"),
+    ("Product ta khub valo, thanks!", 5, "positive"),
+    ("Darun quality, fatafati design.", None, "positive"),
+    ("Kapor ta kharap, faltu.", 1, "negative"),
+    ("Motamuti, cholbe.", 3, "neutral"),
+    ("Joss panjabi bhai!", 5, "positive"),
+    ("Excellent quality, very comfortable to wear.", 5, "positive"),
+    ("Great fit and fast delivery. Highly recommend!", 5, "positive"),
+    ("Loved the color, exactly as shown.", 5, "positive"),
+    ("Value for money, I am happy.", 4, "positive"),
+    ("Not bad for the price.", 4, "positive"),
+    ("Worst purchase ever, complete waste of money.", 1, "negative"),
+    ("The stitching came apart after one wash. Very disappointed.", 1, "negative"),
+    ("Arrived damaged and two weeks late.", 1, "negative"),
+    ("Fake product, looks nothing like the photo.", 1, "negative"),
+    ("Not worth it, the fabric is cheap.", 2, "negative"),
+    ("Color faded quickly, poor quality.", 2, "negative"),
+    ("It's okay, average quality.", 3, "neutral"),
+    ("Fine for daily use, nothing special.", 3, "neutral"),
+    ("Decent shirt.", 3, "neutral"),
+    ("The size is not good for me, too small.", 2, "negative"),
+    ("Delivery guy was rude but the panjabi is beautiful.", 4, "positive"),
+    ("Good product but delivery was delayed.", 3, "neutral"),
+    ("Don't buy this, defective zipper.", 1, "negative"),
+    ("I didn't like the fabric.", 2, "negative"),
+    ("Perfect gift for Eid, my father loved it.", 5, "positive"),
+    ("Wrong size delivered, asked for refund.", 2, "negative"),
+    ("ভালো, তবে দাম একটু বেশি।", 4, "positive"),
+    ("কালার একটু ভিন্ন, তবে চলবে।", 3, "neutral"),
+    ("পছন্দ হয়নি।", 2, "negative"),
+    ("অসাধারণ কালেকশন, সেরা শপ।", 5, "positive"),
+    (None, 5, "positive"),
+    (None, 1, "negative"),
+    ("", 3, "neutral"),
+    ("Received the parcel today.", 4, "positive"),
+    ("Received the parcel today.", 2, "negative"),
+    ("The panjabi is great but it tore at the seam.", 2, "negative"),
+    ("Amazing!!", 1, "positive"),
+    ("ডেলিভারি সময়মতো পেয়েছি, কাপড় ভালোই।", 4, "positive"),
+    ("Superb stitching, soft fabric.", None, "positive"),
+    ("Horrible experience, never again.", None, "negative"),
+    # Negation stops at clause punctuation; a negated complaint is praise
+    ("no issues. great fit", None, "positive"),
+    ("no complaints, good quality", None, "positive"),
+    ("No problems at all, fast delivery.", None, "positive"),
+    ("Never again. Bad quality.", None, "negative"),
+    ("Had problems with the zipper.", None, "negative"),
+    ("কোনো সমস্যা নেই, কাপড় ভালো।", None, "positive"),
+    ("কোনো অভিযোগ নেই।", None, "positive"),
+    ("ভালো না। রং উঠে যায়।", None, "negative"),
+]
+
+
+def evaluate(min_confidence: float) -> None:
+    texts = [text for text, _, _ in LABELED_REVIEWS]
+    ratings = [rating for _, rating, _ in LABELED_REVIEWS]
+    expected = [label for _, _, label in LABELED_REVIEWS]
+    scores = score_reviews(texts, ratings)
+
+    correct = scores.labels == expected
+    confident = scores.confidence >= min_confidence
+    print(f"fixture reviews:          {len(texts)}")
+    print(f"accuracy (all):           {correct.mean():.1%}")
+    print(f"confident (no LLM call):  {confident.mean():.1%}")
+    print(f"accuracy when confident:  {correct[confident].mean():.1%}")
+    for (text, rating, label), got, conf in zip(LABELED_REVIEWS, scores.labels, scores.confidence):
+        if got != label and conf >= min_confidence:
+            print(f"  miss: {text!r} ({rating}) expected {label}, got {got} @ {conf:.2f}")
+
+
+def throughput(sizes: list[int]) -> None:
+    print(f"\n{'reviews':>9} {'seconds':>9} {'reviews/s':>11}")
+    for size in sizes:
+        repeats = size // len(LABELED_REVIEWS) + 1
+        texts = ([text for text, _, _ in LABELED_REVIEWS] * repeats)[:size]
+        ratings = ([rating for _, rating, _ in LABELED_REVIEWS] * repeats)[:size]
+        start = time.perf_counter()
+        score_reviews(texts, ratings)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>9,} {elapsed:>9.3f} {size / elapsed:>11,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--min-confidence", type=float, default=settings.SENTIMENT_LEXICON_MIN_CONFIDENCE)
+    args = parser.parse_args()
+    evaluate(args.min_confidence)
+    throughput(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
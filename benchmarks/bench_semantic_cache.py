@@ -0,0 +1,111 @@
+"""Benchmark the semantic answer cache on near-miss and paraphrase questions.
+
+Each pair is stored and looked up in a fresh cache, as the chatbot and the
+advisor would: the first question's answer is cached, the second asks again.
+Near misses (opposite or different qualifiers) must never reuse the answer;
+paraphrases should. The report shows the best similarity per pair and the
+outcome at each threshold, then times lookups in a full namespace.
+
+Usage:
+    python benchmarks/bench_semantic_cache.py
+    python benchmarks/bench_semantic_cache.py --thresholds 0.85 0.9 --entries 512
+"""
+import argparse
+import random
+import time
+
+import _fixtures  # noqa: F401  (configures the app settings)
+
+from app.config import settings
+from app.utils.semantic_cache import SemanticCache
+
+# (cached question, new question): a reused answer would be wrong
+NEAR_MISSES = [
+    ("Which product has the highest sales this month?", "Which product has the lowest sales this month?"),
+    ("Why did revenue increase last week?", "Why did revenue decrease last week?"),
+    ("Is the silk saree available in red?", "Is the silk saree available in blue?"),
+    ("কোন জেলায় বিক্রি বেশি?", "কোন জেলায় বিক্রি কম?"),
+    ("Do you have this panjabi in XL?", "Do you have this panjabi in XXL?"),
+    ("Is this available?", "Is this not available?"),
+    ("Is the cotton panjabi in stock?", "Is the cotton panjabi not in stock?"),
+    ("What is the price for 2 pieces?", "What is the price for 3 pieces?"),
+    ("Do you have size M?", "Do you have size L?"),
+    ("লাল রঙে পাওয়া যাবে?", "নীল রঙে পাওয়া যাবে?"),
+    ("সবচেয়ে বেশি বিক্রি হওয়া পণ্য কোনটি?", "সবচেয়ে কম বিক্রি হওয়া পণ্য কোনটি?"),
+    ("ডেলিভারি পেয়েছি", "ডেলিভারি পাইনি"),
+    ("Which district orders the most?", "Which district orders the least?"),
+    ("Should I raise the price of the black shirt?", "Should I raise the price of the white shirt?"),
+    ("Best selling category in Dhaka?", "Worst selling category in Dhaka?"),
+    ("How can I increase repeat orders?", "How can I reduce repeat orders?"),
+    # Same qualifiers: only the similarity threshold separates these
+    ("Is the cotton panjabi in stock?", "Is the linen panjabi in stock?"),
+    ("What is the price of the silk saree?", "What is the price of the cotton saree?"),
+    ("Sales in Dhaka last month?", "Sales in Khulna last month?"),
+    ("Do you have the panjabi?", "Do you have the pajama?"),
+    ("Show weekly sales", "Show monthly sales"),
+]
+
+# (cached question, reworded question): reusing the answer is right
+PARAPHRASES = [
+    ("What is the price of this panjabi?", "what is the price of this panjabi"),
+    ("What's the delivery charge?", "Whats the delivery charge?"),
+    ("Is the silk saree available in red?", "is the silk saree available in red ??"),
+    ("কোন জেলায় বিক্রি বেশি?", "কোন জেলায় বিক্রি বেশি।"),
+    ("Which product has the highest sales this month?", "Which product has the highest sales this month"),
+    ("Do you have this panjabi in XL?", "Do you have this Panjabi in XL"),
+    ("How can I increase repeat orders?", "how can i increase my repeat orders?"),
+    ("Which district orders the most?", "Which districts order the most?"),
+]
+
+
+def best_similarity(cached: str, asked: str) -> tuple[float, bool]:
+    """Similarity the cache reports for ``asked``, and whether the qualifiers matched."""
+    cache = SemanticCache(threshold=0.0)
+    cache.store("bench", cached, "answer")
+    answer, similarity = cache.lookup("bench", asked)
+    return similarity, answer is not None
+
+
+def evaluate(thresholds: list[float]) -> None:
+    header = "".join(f"{t:>7.2f}" for t in thresholds)
+    for title, pairs, should_match in (("near misses", NEAR_MISSES, False), ("paraphrases", PARAPHRASES, True)):
+        print(f"\n{title} (expected: {'reuse' if should_match else 'no reuse'})")
+        print(f"{'similarity':>10} {'qualifiers':>10}{header}  question")
+        wrong = [0] * len(thresholds)
+        for cached, asked in pairs:
+            similarity, compared = best_similarity(cached, asked)
+            outcomes = ""
+            for i, threshold in enumerate(thresholds):
+                reused = compared and similarity >= threshold
+                wrong[i] += reused != should_match
+                outcomes += f"{'reuse' if reused else '-':>7}"
+            print(f"{similarity:>10.3f} {'match' if compared else 'differ':>10}{outcomes}  {asked}")
+        print(f"{'wrong':>21}" + "".join(f"{w:>7}" for w in wrong))
+
+
+def lookup_latency(entries: int, lookups: int = 2000) -> None:
+    rng = random.Random(7)
+    words = ["price", "stock", "delivery", "size", "colour", "panjabi", "saree", "cotton", "silk", "return",
+             "order", "discount", "কত", "দাম", "ডেলিভারি", "আছে", "সাইজ", "কাপড়"]
+    cache = SemanticCache(max_entries_per_namespace=entries)
+    questions = [" ".join(rng.choices(words, k=6)) for _ in range(entries)]
+    for i, question in enumerate(questions):
+        cache.store("bench", question, f"answer {i}")
+    start = time.perf_counter()
+    for i in range(lookups):
+        cache.lookup("bench", questions[i % entries])
+    elapsed = time.perf_counter() - start
+    print(f"\n{entries} entries: {elapsed / lookups * 1000:.3f} ms per lookup")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, settings.SEMANTIC_CACHE_THRESHOLD])
+    parser.add_argument("--entries", type=int, default=settings.SEMANTIC_CACHE_MAX_ENTRIES)
+    args = parser.parse_args()
+    evaluate(args.thresholds)
+    lookup_latency(args.entries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark the batched Holt stock-out forecaster.
+
+Fits synthetic products x days sales matrices and reports fit + forecast
+time and next-14-day demand error against the old 14-day average.
+``--with-db`` also times loading the matrix from the benchmark database.
+
+Usage:
+    python benchmarks/bench_stock_forecast.py
+    python benchmarks/bench_stock_forecast.py --skus 10000 100000 --with-db
+"""
+import argparse
+import time
+
+import _fixtures  # noqa: F401  (configures the benchmark database)
+import numpy as np
+from _fixtures import seed, session
+
+from app.analytics.service import rebuild_daily_sales_rollup
+from app.inventory.forecast import DAMPING, fit_holt, forecast_stock_out, load_sales_matrix
+
+
+def synthetic_sales(skus: int, days: int, rng: np.random.Generator):
+    """Poisson sales around a per-SKU base rate with a linear trend; returns (history, future)."""
+    base = rng.gamma(2.0, 2.0, skus)
+    slope = rng.normal(0.0, 0.02, skus) * base
+    t = np.arange(days)
+    rate = np.maximum(base[:, None] + slope[:, None] * t[None, :], 0.0)
+    sales = rng.poisson(rate).astype(float)
+    return sales[:, :-14], sales[:, -14:]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--days", type=int, default=56)
+    parser.add_argument("--with-db", action="store_true")
+    args = parser.parse_args()
+    rng = np.random.default_rng(11)
+
+    print(f"{'SKUs':>9} {'fit+forecast (s)':>17} {'SKUs/s':>12} {'holt MAE':>9} {'14d-avg MAE':>12}")
+    for skus in args.skus:
+        history, future = synthetic_sales(skus, args.days + 14, rng)
+        stock = rng.integers(0, 200, skus).astype(float)
+
+        start = time.perf_counter()
+        model = fit_holt(history)
+        forecast_stock_out(stock, model)
+        elapsed = time.perf_counter() - start
+
+        # Units over the next 14 days: damped-trend forecast vs flat 14-day average
+        damping = np.cumsum(DAMPING ** np.arange(1, 15))
+        holt_units = np.maximum(model.level[:, None] + damping[None, :] * model.trend[:, None], 0).sum(axis=1)
+        naive_units = history[:, -14:].mean(axis=1) * 14
+        actual = future.sum(axis=1)
+        holt_mae = np.abs(holt_units - actual).mean()
+        naive_mae = np.abs(naive_units - actual).mean()
+        print(f"{skus:>9,} {elapsed:>17.4f} {skus / elapsed:>12,.0f} {holt_mae:>9.2f} {naive_mae:>12.2f}")
+
+    if args.with_db:
+        print("\nend to end (rollup -> matrix -> fit + forecast)")
+        for skus in args.skus:
+            seed(order_lines=skus * 4, n_products=skus, days=args.days)
+            with session() as db:
+                rebuild_daily_sales_rollup(db)
+                start = time.perf_counter()
+                _, _, _, stock, sales = load_sales_matrix(db, args.days)
+                loaded = time.perf_counter()
+                forecast_stock_out(stock, fit_holt(sales))
+                done = time.perf_counter()
+            print(f"{skus:>9,} SKUs: load {loaded - start:.3f}s, fit + forecast {done - loaded:.3f}s")
+
+
+if __name__ == "__main__":
+    main()